@@ -0,0 +1,287 @@
+# bench.py
+"""
+piplayer-bench – how accurately does the sequencer fire events?
+
+A synthetic MIDI file (modules/synth_midi.py) is compiled like a real show
+and played by each scheduler mode against a mock GPIODriver with a
+GPIORecorder, which keeps the time of every pin change in shared memory.
+Lateness is that time minus the scheduled time.
+
+    piplayer-bench --tracks 8 --density 20 --chord 3 --load 2 --out run.json
+    piplayer-bench --out new.json --baseline run.json      # exit 1 on regression
+
+Modes:
+  worker   – the persistent SequenceWorker (what the player uses)
+  oneshot  – SequenceProcess.run in a fresh process
+"""
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+from functools import partial
+
+from .modules.config import PlayerConfig
+from .modules.gpio_driver import GPIODriver, gpio_available
+from .modules.gpio_recorder import GPIORecorder, MARK_PIN, MARK_PLAY
+from .modules.sequence_process import SequenceProcess, SequenceWorker
+
+MODES       = ("worker", "oneshot")
+LEAD_S      = 0.5      # schedule starts this long after play (worker load, fork)
+DRAIN_S     = 2.0      # wait this long past the last event before giving up
+REGRESS_MIN = 0.0005   # p99 changes below 0.5 ms are noise, never a regression
+
+
+# ─────────────────────────── helpers ───────────────────────────
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile of an already sorted list (q in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values), math.ceil(q / 100.0 * len(sorted_values))) - 1)
+    return sorted_values[k]
+
+
+def _children_cpu() -> float:
+    ru = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return ru.ru_utime + ru.ru_stime
+
+
+def _burn() -> None:
+    while True:
+        pass
+
+
+def start_load(n: int) -> list:
+    """Spin up `n` busy-loop processes as background CPU load."""
+    procs = [multiprocessing.Process(target=_burn, daemon=True) for _ in range(n)]
+    for proc in procs:
+        proc.start()
+    return procs
+
+
+def stop_load(procs: list) -> None:
+    for proc in procs:
+        proc.terminate()
+    for proc in procs:
+        proc.join()
+
+
+# ─────────────────────────── one run ───────────────────────────
+def run_mode(mode: str, schedule: list, passthrough: bool = False) -> dict:
+    """Play `schedule` once with scheduler `mode`; returns the measurements."""
+    notes = [ev for ev in schedule if ev.msg.type in ("note_on", "note_off")]
+    recorder = GPIORecorder(capacity=len(notes) + 64)
+    # real pins only with --real-gpio: then the write cost is measured too
+    factory = partial(GPIODriver, recorder=recorder, mock=None if passthrough else True)
+
+    last = notes[-1].time_s if notes else 0.0
+    cpu0 = _children_cpu()
+    wall0 = time.monotonic()
+    start = wall0 + LEAD_S
+
+    if mode == "worker":
+        worker = SequenceWorker(time.monotonic, gpio_factory=factory)
+        worker.start()
+        worker.load("bench", schedule)
+        worker.play("bench", start)
+        _wait(recorder, len(notes) + 2, start + last + DRAIN_S)   # + play, all off
+        worker.close()
+    elif mode == "oneshot":
+        proc = multiprocessing.Process(
+            target=SequenceProcess.run, args=(schedule, start),
+            kwargs={"gpio_factory": factory}, daemon=True,
+        )
+        proc.start()
+        _wait(recorder, len(notes) + 1, start + last + DRAIN_S)   # + play
+        proc.join(timeout=DRAIN_S)
+        if proc.is_alive():
+            proc.terminate()
+            proc.join()
+    else:
+        raise ValueError(f"unknown mode: {mode}")
+
+    wall = time.monotonic() - wall0
+    cpu = _children_cpu() - cpu0
+
+    fired_at = _fire_times(recorder.entries())[:len(notes)]
+    fired = len(fired_at)
+    late = sorted(t - (start + ev.time_s) for t, ev in zip(fired_at, notes))
+    span = fired_at[-1] - fired_at[0] if fired > 1 else 0.0
+    return {
+        "mode":         mode,
+        "events":       len(notes),
+        "fired":        fired,
+        "missed":       len(notes) - fired,
+        "late_ms": {
+            "min":  round(late[0] * 1000, 4) if late else 0.0,
+            "mean": round(sum(late) / len(late) * 1000, 4) if late else 0.0,
+            "p50":  round(percentile(late, 50) * 1000, 4),
+            "p95":  round(percentile(late, 95) * 1000, 4),
+            "p99":  round(percentile(late, 99) * 1000, 4),
+            "max":  round(late[-1] * 1000, 4) if late else 0.0,
+        },
+        "events_per_s": round(fired / span, 1) if span > 0 else None,
+        "cpu_s":        round(cpu, 4),
+        "cpu_pct":      round(100.0 * cpu / wall, 2) if wall > 0 else 0.0,
+        "wall_s":       round(wall, 3),
+    }
+
+
+def _fire_times(entries: list) -> list:
+    """Pin-change times after the play marker (markers dropped)."""
+    times, playing = [], False
+    for t, pin, code in entries:
+        if pin == MARK_PIN:
+            playing = playing or code == MARK_PLAY
+        elif playing:
+            times.append(t)
+    return times
+
+
+def _wait(recorder: GPIORecorder, entries: int, deadline: float) -> None:
+    while recorder.total < entries and time.monotonic() < deadline:
+        time.sleep(0.05)
+
+
+def load_schedule(midi_path: str, burst: bool = False) -> list:
+    from .modules.sequence_loader import SequenceLoader, MidiEvent
+    schedule = SequenceLoader(midi_path).compile(PlayerConfig().offset_for(0.0))
+    if burst:
+        # everything due at once: measures raw fire throughput
+        schedule = [MidiEvent(0.0, ev.track, ev.msg) for ev in schedule]
+    return schedule
+
+
+# ─────────────────────────── reporting ───────────────────────────
+def _print_result(res: dict) -> None:
+    late = res["late_ms"]
+    eps = res["events_per_s"]
+    print(f"[Bench] {res['mode']:<8} {res['fired']}/{res['events']} events  "
+          f"late p50={late['p50']:.3f} p95={late['p95']:.3f} "
+          f"p99={late['p99']:.3f} max={late['max']:.3f} ms  "
+          f"{eps if eps is not None else '-'} ev/s  cpu={res['cpu_pct']:.1f}%")
+
+
+def compare(results: list, baseline: dict, tolerance: float) -> bool:
+    """Print p99/max changes against a previous run; False on a regression."""
+    old = {}
+    for run in baseline.get("runs", []):
+        old.setdefault(run["mode"], run)
+    ok = True
+    for res in results:
+        prev = old.get(res["mode"])
+        if prev is None:
+            continue
+        for key in ("p50", "p99", "max"):
+            a, b = prev["late_ms"][key], res["late_ms"][key]
+            print(f"[Bench] {res['mode']:<8} {key:<4} {a:8.3f} → {b:8.3f} ms")
+        a, b = prev["late_ms"]["p99"], res["late_ms"]["p99"]
+        if b - a > REGRESS_MIN * 1000 and b > a * (1.0 + tolerance):
+            print(f"[Bench] ❌ {res['mode']}: p99 regressed {a:.3f} → {b:.3f} ms")
+            ok = False
+        if res["missed"] > prev.get("missed", 0):
+            print(f"[Bench] ❌ {res['mode']}: {res['missed']} events never fired")
+            ok = False
+    return ok
+
+
+# -------------------------------------------------------------------- #
+def main() -> None:
+    multiprocessing.set_start_method("fork", force=True)
+
+    p = argparse.ArgumentParser(description="PiPlayer scheduler benchmark")
+    p.add_argument("--modes", default=",".join(MODES),
+                   help=f"Comma-separated scheduler modes (default: {','.join(MODES)})")
+    p.add_argument("--midi", help="Benchmark an existing MIDI file instead of a generated one")
+    p.add_argument("--tracks", type=int, default=4)
+    p.add_argument("--duration", type=float, default=20.0, help="Seconds (at 120 BPM)")
+    p.add_argument("--density", type=float, default=8.0, help="Onsets per second per track")
+    p.add_argument("--chord", type=int, default=1, help="Notes per onset")
+    p.add_argument("--tempo-changes", type=int, default=0)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--burst", action="store_true",
+                   help="Schedule every event at t=0 (raw throughput)")
+    p.add_argument("--load", type=int, default=0, help="Background busy-loop processes")
+    p.add_argument("--repeat", type=int, default=1, help="Runs per mode")
+    p.add_argument("--real-gpio", action="store_true",
+                   help="Also drive the real pins (on a Pi)")
+    p.add_argument("--save-midi", metavar="PATH",
+                   help="Write the generated MIDI file here and exit")
+    p.add_argument("--out", help="Write results as JSON")
+    p.add_argument("--baseline", help="Previous --out file to compare against")
+    p.add_argument("--tolerance", type=float, default=0.25,
+                   help="Allowed relative p99 increase vs the baseline (default: 0.25)")
+    args = p.parse_args()
+
+    modes = [m.strip() for m in args.modes.split(",") if m.strip()]
+    for mode in modes:
+        if mode not in MODES:
+            p.error(f"unknown mode {mode!r} (choose from {', '.join(MODES)})")
+
+    params = {k: getattr(args, k) for k in
+              ("tracks", "duration", "density", "chord", "tempo_changes",
+               "seed", "burst", "load", "repeat", "real_gpio")}
+
+    midi_path = args.midi or args.save_midi
+    tmp = None
+    if not args.midi:
+        from .modules.synth_midi import generate
+        if not midi_path:
+            tmp = tempfile.NamedTemporaryFile(suffix=".mid", delete=False)
+            tmp.close()
+            midi_path = tmp.name
+        n = generate(midi_path, tracks=args.tracks, duration=args.duration,
+                     density=args.density, chord=args.chord,
+                     tempo_changes=args.tempo_changes, seed=args.seed)
+        print(f"[Bench] generated {n} note events → {midi_path}")
+        if args.save_midi:
+            return
+    params["midi"] = args.midi
+
+    try:
+        schedule = load_schedule(midi_path, args.burst)
+    finally:
+        if tmp:
+            os.unlink(tmp.name)
+
+    gpio_available()               # probe once, before anything forks
+    load = start_load(args.load)
+    results = []
+    try:
+        for mode in modes:
+            for _ in range(args.repeat):
+                res = run_mode(mode, schedule, passthrough=args.real_gpio)
+                _print_result(res)
+                results.append(res)
+    finally:
+        stop_load(load)
+
+    report = {
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "host": {
+            "machine": platform.machine(),
+            "python":  platform.python_version(),
+            "cpus":    os.cpu_count(),
+        },
+        "params": params,
+        "runs": results,
+    }
+    if args.out:
+        with open(args.out, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"[Bench] results → {args.out}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if not compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,76 +1,290 @@
 # cli.py
+#
+# Backends (libmpv, mido, curses, RPi.GPIO, sockets for sync) are imported
+# only when the chosen mode needs them; the modules below are cheap.
+from __future__ import annotations
 
+import os
 import time
 import argparse
 import json
 import multiprocessing
-from typing import Optional
+import threading
+from functools import partial
+from typing import TYPE_CHECKING, Callable, Optional
 
-from .modules.audio_player import AudioPlayer     # uses follower=...
-from .modules.terminal_gui import TerminalGUI
+from .modules.audio_player import AudioPlayer, AUDIO_BACKENDS, create_audio_player
+from .modules.terminal_gui import TerminalGUI, DEFAULT_FPS
 from .modules.sequence_loader import SequenceLoader
-from .modules.sequence_process import SequenceProcess
-from .modules.sync_network   import SyncMaster, SyncFollower
+from .modules.sequence_layers import (LayeredSequence, load_sequence, sequence_ref,
+                                      stream_scan, stream_sequence)
+from .modules.sequence_stream import SequenceFeeder, compile_stream
+from .modules.sequence_process import SequenceWorker
+from .modules.gpio_driver import GPIODriver
+from .modules.gpio_recorder import GPIORecorder
+from .modules.config import PlayerConfig
+from .modules.audio_cache import AudioCache
+from .modules.status import StatusPublisher, SequenceStatus, STATUS_SOCKET, PUBLISH_HZ
+from .modules.startup_profile import StartupProfile
+from .modules import tracing
+from .modules.daemon import PlayerDaemon, CONTROL_SOCKET, send_command
 
+if TYPE_CHECKING:
+    from .modules.sync_network import SyncMaster, SyncFollower
+    from .modules.clock_hub import HubClock
+
+
+
+def audio_cache(config: PlayerConfig, force: bool = False) -> Optional[AudioCache]:
+    """PCM cache from the config's "audio_cache" block, or defaults if forced."""
+    settings = config.audio_cache
+    if settings is None and force:
+        settings = {}
+    return AudioCache.from_settings(settings) if settings is not None else None
 
 
 class PiPlayer:
     def __init__(
         self,
         audio_file: Optional[str] = None,
-        sequence_file: Optional[str] = None,
+        sequence_file: Optional[str | list[str]] = None,   # file or layer specs
         loop: bool = False,
         gui: bool = False,
+        gui_fps: float = DEFAULT_FPS,
         config_file: Optional[str] = None,
         mode: str = "local",               # local | master | follower
+        status_socket: str = STATUS_SOCKET,
+        status_rate: float = PUBLISH_HZ,   # 0 disables publishing
+        profile: Optional[StartupProfile] = None,
+        pcm_cache: bool = False,           # force the PCM cache on
+        audio_backend: str = "mpv",        # mpv | pcm
+        pcm_sink: str = "alsa",            # pcm backend output, see pcm_player.make_sink
+        record_gpio: Optional[str] = None, # dump every pin change here on exit
+        via_hub: bool = False,             # follower: read time from the local clock hub
+        stream: bool = False,              # parse the sequence while it plays
     ):
         self.audio_file   = audio_file
         self.sequence_file= sequence_file
         self.loop         = loop
         self.config_file  = config_file
         self.mode         = mode
+        self.via_hub      = via_hub
+        self.stream       = stream
 
         self.audio_player:   Optional[AudioPlayer]      = None
-        self.sequence:       Optional[SequenceLoader]   = None
+        self.sequence:       Optional[SequenceLoader | LayeredSequence] = None
         self.gui:            Optional[TerminalGUI]      = None
-        self.sequence_proc:  Optional[multiprocessing.Process] = None
-        self.sync:           Optional[SyncFollower]     = None
-
+        self.worker:         Optional[SequenceWorker]   = None
+        self.feeder:         Optional[SequenceFeeder]   = None
+        self._next_feeder:   Optional[SequenceFeeder]   = None   # streaming: the next loop
+        self._prefetch:      Optional[threading.Thread] = None
+        self._stream_pins:   set                        = set()
+        self.sequence_duration = 0.0
+        self.sync:           Optional[SyncMaster | SyncFollower | HubClock] = None
+        self.schedule:       list                       = []
+        self.audio_shift     = 0.0
+        self.loop_count = 0
+        self.position   = 0.0
+        self.profile    = profile or StartupProfile()
+
+        self.record_gpio = record_gpio
+        self.recorder: Optional[GPIORecorder] = None
+        if record_gpio:
+            self.recorder = GPIORecorder()        # shared memory: before the worker forks
+
+        self.status: Optional[StatusPublisher] = None
+        self.seq_status = SequenceStatus()
+        if status_rate > 0:
+            self.status = StatusPublisher(status_socket, status_rate)
+
+        self.config = PlayerConfig.load(self.config_file)
+        self.profile.mark("config")
+
+        # a follower's fit lives in shared memory: the worker can take its
+        # clock now, listening starts in play()
+        if self.mode == "follower":
+            if self.via_hub:
+                from .modules.clock_hub import HubClock
+                self.sync = HubClock()
+            else:
+                from .modules.sync_network import SyncFollower
+                self.sync = SyncFollower()
 
         if self.audio_file:
-            self.audio_player = AudioPlayer(self.audio_file)
+            # cheap: mpv itself is only created by warm_up()
+            self.audio_player = create_audio_player(audio_backend, self.audio_file,
+                                                    latency=self.config.audio_latency,
+                                                    cache=audio_cache(self.config, pcm_cache),
+                                                    sink=pcm_sink)
+
+        # fork the worker before mpv starts its threads; it sets up GPIO in
+        # its own process while the sequence is parsed here
+        if self.sequence_file:
+            import mido    # noqa: F401  the worker unpickles mido Messages: inherit the import
+            self.worker = SequenceWorker(self._worker_clock(), self.seq_status,
+                                         gpio_factory=partial(GPIODriver, recorder=self.recorder))
+            self.worker.start()
+            self.profile.mark("worker fork")
+
+        warmers = []
+        if self.audio_player:
+            warmers.append(self._background(f"{audio_backend} init + decode",
+                                            self.audio_player.warm_up))
 
         if self.sequence_file:
-            self.sequence = SequenceLoader(self.sequence_file)
+            if self.stream:
+                self.sequence_duration, self._stream_pins = stream_scan(self.sequence_file)
+                self.profile.mark("sequence scan")
+                self.feeder = SequenceFeeder(self._stream_schedule())
+                self.feeder.preload(self.worker, "main", self._stream_pins)
+                self.profile.mark("first window")
+            else:
+                self.sequence = load_sequence(self.sequence_file)
+                self.profile.mark("sequence load")
+                self.schedule = self._compile_schedule()
+                self.profile.mark("compile")
+                self.worker.load("main", self.schedule)
 
+        for thr in warmers:
+            thr.join()
+        self.profile.mark("backends ready")
 
-        self.sequence_duration = max(
-            (ev.time_s for ev in self.sequence.events), default=0.0
-        ) if self.sequence else 0.0
+
+        if self.sequence:
+            self.sequence_duration = max((ev.time_s for ev in self.sequence.events),
+                                         default=0.0)
 
 
-        # optional GUI prep  ︙ (unchanged) ︙
         if gui:
-            track_events = {}
+            self.gui = TerminalGUI.for_events(
+                self.sequence.events if self.sequence else [],
+                self.sequence_duration, fps=gui_fps,
+            )
+            if self.feeder:
+                self.gui.set_status("streaming: track lanes are not shown")
 
-            # ( … same as before – omitted for brevity … )
-            # keep all existing GUI code here
     # ────────────────────────────────────────────────────────
 
+    def _background(self, phase: str, fn: Callable[[], object]) -> threading.Thread:
+        def run():
+            with self.profile.parallel(phase):
+                fn()
+        thr = threading.Thread(target=run, daemon=True)
+        thr.start()
+        return thr
+
+    def _offsets(self) -> Callable[[str], float]:
+        """
+        Per-track shift so every event *lands* on the beat as heard:
+        earlier by the output's latency, later by the audio latency.
+        In follower mode AudioPlayer already seeks mpv ahead by its
+        latency, so heard audio is on the master clock; with the pcm
+        backend the worker runs on the sample clock, which already
+        reports the heard position.
+        """
+        self.audio_shift = 0.0
+        if self.audio_player and self.mode != "follower" and not self._sample_clock():
+            self.audio_shift = self.audio_player.latency
+        return self.config.offset_for(self.audio_shift)
+
+    def _compile_schedule(self) -> list:
+        return self.sequence.compile(self._offsets())
+
+    def _stream_schedule(self):
+        """The compiled schedule as a stream (see sequence_stream.py)."""
+        offset_for = self._offsets()
+        return compile_stream(stream_sequence(self.sequence_file), offset_for,
+                              self.config.min_offset(self.audio_shift))
+
+    def _sample_clock(self) -> bool:
+        """pcm backend outside follower mode: lock the sequence to the samples."""
+        return self.mode != "follower" and hasattr(self.audio_player, "get_time")
+
+    def _worker_clock(self) -> Callable[[], float]:
+        if self.mode == "follower":
+            return self.sync.get_time
+        if self._sample_clock():
+            return self.audio_player.clock.get_time
+        return time.monotonic
+
+    def _start_sequence(self, cycle_start: float) -> None:
+        # follower: events are placed on the master timeline (starts at 0);
+        # sample clock: the audio position is the sequence position
+        if self.mode == "follower" or self._sample_clock():
+            cycle_start = 0.0
+
+        if self.stream:
+            if self.feeder.started:              # a loop: play the prefetched pass
+                self.feeder.stop()
+                if self._prefetch is None:
+                    self._prefetch_loop()
+                self._prefetch.join()
+                self._prefetch = None
+                self.feeder, self._next_feeder = self._next_feeder, None
+            self.feeder.begin(self._worker_clock(), cycle_start)
+        else:
+            self.worker.play("main", cycle_start)
+
+    def _prefetch_loop(self) -> None:
+        """
+        Streaming + loop: parse and load the next pass's first window in the
+        background, under the other schedule name, so the loop boundary
+        only has to send play.
+        """
+        name = "loop" if self.feeder.name == "main" else "main"
+
+        def run():
+            feeder = SequenceFeeder(self._stream_schedule())
+            feeder.preload(self.worker, name, self._stream_pins)
+            self._next_feeder = feeder
+
+        self._prefetch = threading.Thread(target=run, daemon=True)
+        self._prefetch.start()
+
+    def _snapshot(self) -> dict:
+        """Compact status for piplayer-monitor."""
+        sync_offset = None
+        if self.mode == "follower" and self.sync:
+            sync_offset = self.sync.median_drift()
+        return {
+            "mode":     self.mode,
+            "audio":    self.audio_file,
+            "sequence": sequence_ref(self.sequence_file),
+            "pos":      round(self.position, 3),
+            "total":    self.sequence_duration,
+            "loop":     self.loop_count,
+            "drift":    self.audio_player.drift if self.audio_player else None,
+            "sync":     sync_offset,
+            "late":     self.seq_status.lateness[0],
+            "late_max": self.seq_status.lateness[1],
+            "pins":     self.seq_status.active_pins(),
+        }
+
+    def _dump_recording(self) -> None:
+        """Write the GPIO recording with what piplayer-gpiotrace needs to check it."""
+        meta = {
+            "sequence":    sequence_ref(self.sequence_file),
+            "config":      os.path.abspath(self.config_file) if self.config_file else None,
+            "audio_shift": self.audio_shift,
+            "mode":        self.mode,
+        }
+        n = self.recorder.dump(self.record_gpio, meta)
+        print(f"[GPIO] {n} recorded entries → {self.record_gpio}")
+
     def play(self) -> None:
         print("Starting PiPlayer…")
         if self.gui:
             self.gui.start()
 
 
-        # create sync object
+        # create sync object (the master timeline starts here)
         if self.mode == "master":
+            from .modules.sync_network import SyncMaster
             print("🧭  Sync Mode: MASTER")
             self.sync = SyncMaster()
             self.sync.start()
         elif self.mode == "follower":
-            print("🎯  Sync Mode: FOLLOWER")
-            self.sync = SyncFollower()
+            print("🎯  Sync Mode: FOLLOWER" + (" (via clock hub)" if self.via_hub else ""))
             self.sync.start()
 
             # ✅ Fix 3: Wait for actual sync packets to arrive
@@ -84,6 +298,7 @@ class PiPlayer:
             else:
                 print("[SyncFollower] ❌ Timeout — no master detected. Exiting.")
                 return  # or raise SystemExit(1)
+        self.profile.mark("sync")
 
 
         try:
@@ -96,9 +311,6 @@ class PiPlayer:
                     self.gui.reset()
 
 
-                cycle_start_monotonic = time.monotonic()
-
-
                 # ─── AUDIO ──────────────────────────────────────
                 if self.audio_player:
                     if self.mode == "follower":
@@ -107,27 +319,36 @@ class PiPlayer:
                     else:
                         self.audio_player.start()         # local / master
 
+                # audio position 0 ≈ now (start() returns on first time_pos)
+                cycle_start_monotonic = time.monotonic()
+                self.profile.mark("audio start")
+
 
                 # ─── SEQUENCE (GPIO/MIDI) ──────────────────────
 
-                if self.sequence:
-                    fresh_events = list(self.sequence.events)
-                    time_fn = self.sync.get_time if self.sync else time.monotonic
-                    self.sequence_proc = multiprocessing.Process(
-                        target=SequenceProcess.run,
-                        args=(fresh_events, time_fn),
-                        daemon=True
-                    )
-                    self.sequence_proc.start()
+                if self.sequence_file:
+                    self._start_sequence(cycle_start_monotonic)
+                    self.profile.mark("worker start")
 
 
                 # ─── MAIN LOOP ─────────────────────────────────
 
                 while True:
                     now_mono = time.monotonic()
+                    if self._sample_clock():
+                        self.position = self.audio_player.get_time()
+                    else:
+                        self.position = now_mono - cycle_start_monotonic
 
                     if self.gui:
-                        self.gui.update(now_mono - cycle_start_monotonic)
+                        self.gui.update(self.position)
+                    if self.status:
+                        self.status.maybe_publish(self._snapshot)
+                    if not self.profile.done:
+                        first = (self.seq_status.first_fire[0] if self.sequence_file
+                                 else cycle_start_monotonic)
+                        if first:
+                            self.profile.finish(first)
 
 
                     # audio finished?
@@ -137,25 +358,29 @@ class PiPlayer:
                                 self.audio_player.start(follower=self.sync)
                             else:
                                 self.audio_player.start()
-                            cycle_start_monotonic = now_mono
+                            cycle_start_monotonic = time.monotonic()
+                            if self.sequence_file:
+                                self._start_sequence(cycle_start_monotonic)
+                            self.loop_count += 1
                             continue
                         break
 
+                    if self.feeder and self.feeder.done:
+                        self.sequence_duration = max(self.sequence_duration,
+                                                     self.feeder.last_time)
+                        if self.loop and self._prefetch is None:
+                            self._prefetch_loop()
+
                     # sequence-only end?
-                    if (not self.audio_player) and self.sequence:
-                        t = (self.sync.get_time() if self.sync else now_mono) \
+                    if ((not self.audio_player) and self.sequence_file
+                            and (self.feeder is None or self.feeder.done)):
+                        t = (self.sync.get_time() if self.mode == "follower" else now_mono) \
                             - cycle_start_monotonic
                         if t >= self.sequence_duration:
                             if self.loop:
-                                fresh_events = list(self.sequence.events)
-                                time_fn = self.sync.get_time if self.sync else time.monotonic
-                                self.sequence_proc = multiprocessing.Process(
-                                    target=SequenceProcess.run,
-                                    args=(fresh_events, time_fn),
-                                    daemon=True
-                                )
-                                self.sequence_proc.start()
+                                self._start_sequence(now_mono)
                                 cycle_start_monotonic = now_mono
+                                self.loop_count += 1
                                 continue
 
                             break
@@ -166,10 +391,10 @@ class PiPlayer:
                 if self.audio_player:
                     self.audio_player.wait_done()
 
-                if self.sequence_proc:
-                    self.sequence_proc.terminate()
-                    self.sequence_proc.join()
-                    self.sequence_proc = None
+                if self.feeder:
+                    self.feeder.stop()
+                if self.worker:
+                    self.worker.stop()
 
                 if not self.loop:
                     break
@@ -178,17 +403,25 @@ class PiPlayer:
             print("\nStopping playback…")
             if self.audio_player:
                 self.audio_player.stop()
-            if self.sequence_proc:
-                self.sequence_proc.terminate()
-                self.sequence_proc.join()
 
         finally:
+            if self.feeder:
+                self.feeder.stop()
+            if self.worker:
+                self.worker.close()
+
+            if self.recorder:
+                self._dump_recording()
+
             if self.gui:
                 self.gui.stop()
 
             if self.sync:
                 self.sync.stop()
 
+            if self.status:
+                self.status.close()
+
 
 # -------------------------------------------------------------------
 def main() -> None:
@@ -196,18 +429,98 @@ def main() -> None:
 
     p = argparse.ArgumentParser(description="PiPlayer – audio + GPIO/MIDI player")
     p.add_argument("audio_file", nargs="?", default=None, help="Audio/Video file")
-    p.add_argument("-s", "--sequence", help="Sequence file (MIDI)")
+    p.add_argument("-s", "--sequence", action="append", metavar="FILE[@OFFSET][:ROUTE]",
+                   help="Sequence file (MIDI); repeat to layer several, "
+                        "e.g. -s base.mid -s fx.mid@12:60=17")
+    p.add_argument("--stream", action="store_true",
+                   help="Start playing while the sequence is still being read "
+                        "(long shows; memory bounded by a short lookahead)")
     p.add_argument("-l", "--loop", action="store_true", help="Loop playback")
     p.add_argument("-g", "--gui",  action="store_true", help="Show ASCII GUI")
+    p.add_argument("--gui-fps", type=float, default=DEFAULT_FPS,
+                   help=f"GUI refresh rate (default: {DEFAULT_FPS:g})")
+    p.add_argument("-c", "--config", help="Config file (track mappings, latencies)")
     p.add_argument("--mode", choices=["local", "master", "follower"],
                    default="local", help="Clock mode")
+    p.add_argument("--clock-hub", action="store_true",
+                   help="Run the single-host clock hub (network sync for local followers)")
+    p.add_argument("--via-hub", action="store_true",
+                   help="Follower: read master time from the local clock hub")
+    p.add_argument("--status-socket", default=STATUS_SOCKET,
+                   help="Unix socket for piplayer-monitor snapshots")
+    p.add_argument("--status-rate", type=float, default=PUBLISH_HZ,
+                   help=f"Status snapshots per second, 0 = off (default: {PUBLISH_HZ:g})")
+    p.add_argument("--profile-startup", action="store_true",
+                   help="Print a phase-by-phase breakdown of time to first event")
+    p.add_argument("--pcm-cache", action="store_true",
+                   help="Decode compressed audio once into a wav cache (low-CPU boards)")
+    p.add_argument("--audio-backend", choices=AUDIO_BACKENDS, default="mpv",
+                   help="mpv (any format) or pcm (wav streamed from a sample clock)")
+    p.add_argument("--pcm-sink", default="alsa",
+                   help='pcm backend output: "alsa[:device]", "null" or "file:out.wav"')
+    p.add_argument("--record-gpio", metavar="PATH",
+                   help="Record every pin change and write it to PATH on exit "
+                        "(check with piplayer-gpiotrace)")
+    p.add_argument("--cues", help="Play a cue list (gapless; Enter = next cue)")
+    p.add_argument("--daemon", action="store_true",
+                   help="Stay resident with preloaded shows (needs --shows)")
+    p.add_argument("--shows", help="Shows file for --daemon")
+    p.add_argument("--control-socket", default=CONTROL_SOCKET,
+                   help=f"Daemon control socket (default: {CONTROL_SOCKET})")
+    p.add_argument("--send", metavar="CMD",
+                   help='Send a command to a running daemon, e.g. "switch intro"')
+    p.add_argument("--trace", metavar="PATH",
+                   help="Record a Chrome/Perfetto trace of the hot paths to PATH on exit")
     p.add_argument("--debug-midi", action="store_true",
                    help="Just dump note events and exit")
     args = p.parse_args()
+    profile = StartupProfile(enabled=args.profile_startup)
 
     if args.debug_midi and args.sequence:
-        SequenceLoader(args.sequence).debug_print()
+        load_sequence(args.sequence).debug_print()
+
+        return
+
+    if args.send:
+        try:
+            print(json.dumps(send_command(args.send, args.control_socket)))
+        except OSError as e:
+            print(f"❌ No daemon on {args.control_socket}: {e}")
+            raise SystemExit(1)
+        return
+
+    if args.trace:
+        # before the hub starts and the worker forks (it gets its own buffer)
+        tracing.enable(args.trace, process_name="clock hub" if args.clock_hub else "piplayer")
+
+    if args.clock_hub:
+        from .modules.clock_hub import ClockHub
+        ClockHub().serve()
+        return
 
+    if args.via_hub and args.mode != "follower":
+        p.error("--via-hub needs --mode follower")
+
+    if args.cues:
+        from .modules.cue_list import play_cue_list
+        play_cue_list(args.cues, audio_cache(PlayerConfig.load(args.config), args.pcm_cache),
+                      audio_backend=args.audio_backend, pcm_sink=args.pcm_sink)
+        return
+
+    if args.daemon:
+        if not args.shows:
+            p.error("--daemon needs --shows")
+        if args.mode != "local":
+            p.error("--daemon only supports --mode local")
+        PlayerDaemon(
+            args.shows,
+            socket_path=args.control_socket,
+            status_socket=args.status_socket,
+            status_rate=args.status_rate,
+            cache=audio_cache(PlayerConfig.load(args.config), args.pcm_cache),
+            audio_backend=args.audio_backend,
+            pcm_sink=args.pcm_sink,
+        ).serve()
         return
 
     PiPlayer(
@@ -215,7 +528,17 @@ def main() -> None:
         sequence_file=args.sequence,
         loop=args.loop,
         gui=args.gui,
+        gui_fps=args.gui_fps,
+        config_file=args.config,
         mode=args.mode,
-
+        status_socket=args.status_socket,
+        status_rate=args.status_rate,
+        profile=profile,
+        pcm_cache=args.pcm_cache,
+        audio_backend=args.audio_backend,
+        pcm_sink=args.pcm_sink,
+        record_gpio=args.record_gpio,
+        via_hub=args.via_hub,
+        stream=args.stream,
     ).play()
 
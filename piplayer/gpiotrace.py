@@ -0,0 +1,183 @@
+# gpiotrace.py
+"""
+piplayer-gpiotrace – inspect GPIO recordings (piplayer --record-gpio).
+
+    piplayer-gpiotrace show run.pigt [--pins 17,18]
+    piplayer-gpiotrace diff run.pigt [-s seq.mid ...] [-c config.json] [--tolerance 0.005]
+
+`diff` rebuilds the expected timeline the same way the player compiled
+it (sequence, config and audio shift are stored in the trace) and
+compares every recorded pin change with it, cycle by cycle (one cycle
+per play marker).  Exit code 1 on missing/extra changes or lateness
+beyond the tolerance, so it can gate timing tests.
+"""
+import argparse
+import sys
+from typing import Optional, Union
+
+from .modules.config import PlayerConfig
+from .modules.gpio_recorder import (
+    load_trace, MARK_PIN, MARK_PLAY, MARK_SEEK, MARK_HANDOVER, MARK_ALL_OFF, MARK_NAMES,
+)
+
+WORST_SHOWN = 5
+
+
+def _pin_filter(spec: Optional[str]) -> Optional[set]:
+    return {int(p) for p in spec.split(",")} if spec else None
+
+
+# ─────────────────────────── show ───────────────────────────
+def show(path: str, pins: Optional[set] = None) -> None:
+    meta, entries, total = load_trace(path)
+    print(f"[Trace] {path}: {len(entries)} entries"
+          + (f" ({total - len(entries)} oldest overwritten)" if total > len(entries) else ""))
+    for key, value in meta.items():
+        print(f"[Trace]   {key}: {value}")
+    if not entries:
+        return
+    t0 = entries[0][0]
+    for t, pin, state in entries:
+        if pin == MARK_PIN:
+            print(f"{t - t0:12.6f}  ── {MARK_NAMES.get(state, state)}")
+        elif pins is None or pin in pins:
+            print(f"{t - t0:12.6f}  pin {pin:<3} {'HIGH' if state else 'LOW'}")
+
+
+# ─────────────────────────── diff ───────────────────────────
+def expected_changes(sequence: Union[str, list], config: Optional[str],
+                     audio_shift: float) -> dict:
+    """Per pin: [(time_s, state)] level changes of the compiled schedule."""
+    from .modules.sequence_layers import load_sequence
+    schedule = load_sequence(sequence).compile(
+        PlayerConfig.load(config).offset_for(audio_shift))
+    levels: dict = {}
+    changes: dict = {}
+    for ev in schedule:
+        if ev.msg.type == "note_on":
+            state = ev.msg.velocity > 0
+        elif ev.msg.type == "note_off":
+            state = False
+        else:
+            continue
+        pin = ev.msg.note
+        if levels.get(pin, False) != state:
+            levels[pin] = state
+            changes.setdefault(pin, []).append((ev.time_s, state))
+    return changes
+
+
+def split_cycles(entries: list) -> list:
+    """[(origin, [entries])] — one cycle per play marker."""
+    cycles = []
+    for t, pin, code in entries:
+        if pin == MARK_PIN and code == MARK_PLAY:
+            cycles.append((t, []))
+        elif cycles:
+            cycles[-1][1].append((t, pin, code))
+    return cycles
+
+
+def recorded_changes(cycle: list) -> Optional[dict]:
+    """Per pin level changes within one cycle; None if it was seeked/handed over."""
+    levels: dict = {}
+    changes: dict = {}
+    for t, pin, state in cycle:
+        if pin == MARK_PIN:
+            if state in (MARK_SEEK, MARK_HANDOVER):
+                return None
+            if state == MARK_ALL_OFF:
+                levels = {}                     # stop: outputs silently LOW
+            continue
+        state = bool(state)
+        if levels.get(pin, False) != state:
+            levels[pin] = state
+            changes.setdefault(pin, []).append((t, state))
+    return changes
+
+
+def diff_cycle(origin: float, recorded: dict, expected: dict) -> dict:
+    late, worst, missing, extra = [], [], 0, 0
+    for pin in sorted(set(recorded) | set(expected)):
+        rec, exp = recorded.get(pin, []), expected.get(pin, [])
+        for (t, state), (exp_t, exp_state) in zip(rec, exp):
+            if state != exp_state:
+                missing += 1
+                continue
+            d = (t - origin) - exp_t
+            late.append(d)
+            worst.append((abs(d), pin, exp_t, d))
+        missing += max(0, len(exp) - len(rec))
+        extra += max(0, len(rec) - len(exp))
+    late.sort()
+    worst.sort(reverse=True)
+    return {"matched": len(late), "missing": missing, "extra": extra,
+            "late": late, "worst": worst[:WORST_SHOWN]}
+
+
+def diff(path: str, sequence: Optional[Union[str, list]], config: Optional[str],
+         audio_shift: Optional[float], tolerance: float) -> bool:
+    meta, entries, total = load_trace(path)
+    sequence = sequence or meta.get("sequence")
+    if not sequence:
+        raise SystemExit("[Trace] no sequence in the trace, pass -s")
+    config = config or meta.get("config")
+    shift = audio_shift if audio_shift is not None else meta.get("audio_shift", 0.0)
+    expected = expected_changes(sequence, config, shift)
+
+    if total > len(entries):
+        print(f"[Trace] ⚠️  {total - len(entries)} oldest entries were overwritten")
+    ok = True
+    cycles = split_cycles(entries)
+    if not cycles:
+        print("[Trace] no play marker in the trace")
+        return False
+    for n, (origin, cycle) in enumerate(cycles):
+        recorded = recorded_changes(cycle)
+        if recorded is None:
+            print(f"[Trace] cycle {n}: seek/hand-over, not compared")
+            continue
+        res = diff_cycle(origin, recorded, expected)
+        late = res["late"]
+        worst = max((abs(d) for d in late), default=0.0)
+        print(f"[Trace] cycle {n}: {res['matched']} matched, {res['missing']} missing, "
+              f"{res['extra']} extra"
+              + (f"  late p50={late[len(late) // 2] * 1000:.3f} "
+                 f"min={late[0] * 1000:.3f} max={late[-1] * 1000:.3f} ms" if late else ""))
+        for _, pin, exp_t, d in res["worst"]:
+            if abs(d) > tolerance:
+                print(f"[Trace]   pin {pin:<3} at {exp_t:9.4f}s  off by {d * 1000:+.3f} ms")
+        if res["missing"] or res["extra"] or worst > tolerance:
+            ok = False
+    print("[Trace] ✅ matches" if ok else "[Trace] ❌ differs")
+    return ok
+
+
+# -------------------------------------------------------------------- #
+def main() -> None:
+    p = argparse.ArgumentParser(description="Show or check GPIO recordings")
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    s = sub.add_parser("show", help="Print the recorded pin changes")
+    s.add_argument("trace")
+    s.add_argument("--pins", help="Only these pins, e.g. 17,18")
+
+    d = sub.add_parser("diff", help="Compare with the expected timeline")
+    d.add_argument("trace")
+    d.add_argument("-s", "--sequence", action="append",
+                   help="Sequence file or layer spec, repeatable (default: the one in the trace)")
+    d.add_argument("-c", "--config", help="Config (default: the one in the trace)")
+    d.add_argument("--audio-shift", type=float,
+                   help="Audio latency the schedule was shifted by (default: from the trace)")
+    d.add_argument("--tolerance", type=float, default=0.005,
+                   help="Allowed |lateness| in seconds (default: 0.005)")
+    args = p.parse_args()
+
+    if args.cmd == "show":
+        show(args.trace, _pin_filter(args.pins))
+    elif not diff(args.trace, args.sequence, args.config, args.audio_shift, args.tolerance):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
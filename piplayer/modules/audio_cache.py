@@ -0,0 +1,139 @@
+# modules/audio_cache.py
+"""
+Decoded PCM cache for compressed audio.
+
+mp3 (and other compressed) input is decoded once with pydub into a 16-bit
+wav at the output device's sample rate and stored under its content hash,
+so mpv only has to stream PCM while the scheduler and sync loop run.
+Entries are touched on every use and the least recently used ones are
+deleted once the cache grows past its size limit.
+
+The rate is the configured `sample_rate` if there is one, else the rate
+the caller asks for (the pcm backend asks its sound card), else 48 kHz.
+
+Enable with `--pcm-cache` or a config block:
+
+    "audio_cache": {"dir": "~/.cache/piplayer/pcm", "max_mb": 1024, "sample_rate": 48000}
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from typing import Optional
+
+DEFAULT_CACHE_DIR   = "~/.cache/piplayer/pcm"
+DEFAULT_MAX_MB      = 1024
+DEFAULT_SAMPLE_RATE = 48000
+PCM_EXTENSIONS      = (".wav",)        # already PCM: played as is
+HASH_CHUNK          = 1 << 20
+INDEX_FILE          = "index.json"     # (path, size, mtime) → content hash
+
+
+def _hash_of(entry: str) -> str:
+    """Content hash of a cache file name ("<hash>-<rate>.wav")."""
+    return os.path.basename(entry).rsplit("-", 1)[0]
+
+
+class AudioCache:
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR,
+                 max_mb: float = DEFAULT_MAX_MB,
+                 sample_rate: Optional[int] = None):
+        self.dir = os.path.expanduser(cache_dir)
+        self.max_bytes = int(max_mb * 1024 * 1024)
+        self.sample_rate = sample_rate
+        self._lock = threading.Lock()
+        os.makedirs(self.dir, exist_ok=True)
+        self._index = self._read_index()
+
+    @classmethod
+    def from_settings(cls, settings: dict) -> "AudioCache":
+        """Build from a config "audio_cache" block (missing keys → defaults)."""
+        return cls(
+            cache_dir   = settings.get("dir", DEFAULT_CACHE_DIR),
+            max_mb      = float(settings.get("max_mb", DEFAULT_MAX_MB)),
+            sample_rate = int(settings["sample_rate"]) if "sample_rate" in settings else None,
+        )
+
+    # ───────────────────────── public ─────────────────────────
+    def prepare(self, path: str, rate: Optional[int] = None) -> str:
+        """
+        Return a PCM file to play for `path`, decoding it on a cache miss.
+        `rate` is the output device's rate, if known (see module docstring).
+        """
+        if path.lower().endswith(PCM_EXTENSIONS):
+            return path
+        rate = self.sample_rate or rate or DEFAULT_SAMPLE_RATE
+        with self._lock:
+            digest = self._digest(path)
+            cached = os.path.join(self.dir, f"{digest}-{rate}.wav")
+            if os.path.exists(cached):
+                os.utime(cached)                       # LRU: mark as used
+                return cached
+            print(f"[AudioCache] decoding {os.path.basename(path)} → {rate} Hz wav")
+            self._decode(path, cached, rate)
+            self._evict(keep=cached)
+            return cached
+
+    # ───────────────────────── internals ─────────────────────────
+    def _digest(self, path: str) -> str:
+        st = os.stat(path)
+        key = f"{os.path.abspath(path)}|{st.st_size}|{st.st_mtime_ns}"
+        digest = self._index.get(key)
+        if digest is None:
+            h = hashlib.sha256()
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                    h.update(chunk)
+            digest = h.hexdigest()[:32]
+            self._index[key] = digest
+            self._write_index()
+        return digest
+
+    def _decode(self, src: str, dst: str, rate: int) -> None:
+        from pydub import AudioSegment      # deferred: only needed on a miss
+        seg = AudioSegment.from_file(src)
+        seg = seg.set_frame_rate(rate).set_sample_width(2)
+        tmp = dst + ".part"
+        seg.export(tmp, format="wav")
+        os.replace(tmp, dst)                # never leave a half-written entry
+
+    def _evict(self, keep: str) -> None:
+        entries = []
+        for name in os.listdir(self.dir):
+            if not name.endswith(".wav"):
+                continue
+            full = os.path.join(self.dir, name)
+            st = os.stat(full)
+            entries.append((st.st_mtime, st.st_size, full))
+        total = sum(size for _, size, _ in entries)
+        evicted = set()
+        for _, size, full in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if full == keep:
+                continue
+            os.unlink(full)
+            total -= size
+            evicted.add(full)
+            print(f"[AudioCache] evicted {os.path.basename(full)}")
+        if evicted:
+            # forget hashes with no wav left at any rate
+            kept = {_hash_of(full) for _, _, full in entries if full not in evicted}
+            gone = {_hash_of(full) for full in evicted} - kept
+            self._index = {k: d for k, d in self._index.items() if d not in gone}
+            self._write_index()
+
+    def _read_index(self) -> dict:
+        try:
+            with open(os.path.join(self.dir, INDEX_FILE)) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_index(self) -> None:
+        tmp = os.path.join(self.dir, INDEX_FILE + ".part")
+        with open(tmp, "w") as f:
+            json.dump(self._index, f)
+        os.replace(tmp, os.path.join(self.dir, INDEX_FILE))
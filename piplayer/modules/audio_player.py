@@ -6,14 +6,19 @@ Assumptions
 -----------
 • We run either in LOCAL/MASTER mode (no follower) or in FOLLOWER mode,
   where a SyncFollower object is passed in and provides get_time().
-• mpv’s reported time_pos lags actual output by MPV_LATENCY seconds.
+• mpv’s reported time_pos lags actual output by `latency` seconds
+  (MPV_LATENCY unless configured, see config.json "latency.audio").
 • After every seek mpv takes ~0.8–1.0 s to refill decode buffer; during
   that time we must ignore the stale time_pos to avoid a seek-cascade.
 """
 
-from mpv import MPV
 import threading, time
-from typing import Protocol, Optional
+from typing import TYPE_CHECKING, Protocol, Optional
+
+from . import tracing
+
+if TYPE_CHECKING:
+    from .audio_cache import AudioCache
 
 
 # ───────── interface follower must expose ─────────
@@ -23,22 +28,33 @@ class ClockSource(Protocol):
 
 
 # ───────── tweakables ─────────────────────────────
-MPV_LATENCY      = 0.30  # 🔽 tighter estimate for fast decode
+MPV_LATENCY      = 0.30  # 🔽 default, override via config latency.audio
 SEEK_THRESHOLD   = 0.10  # 🔽 react to smaller drift
 LARGE_DRIFT      = 0.50  # 🔽 correct more often if sync degrades
 SEEK_COOLDOWN    = 3.0   # 🔽 allow more frequent small seeks
 SEEK_SETTLE      = 0.6   # 🔽 less delay after each seek
 PREDICTIVE_LEAD  = 0.15  # 🔼 slightly more proactive positioning
 SYNC_POLL        = 0.25  # 🔼 faster reaction loop
+STABLE_POLL      = 1000.0  # in sync: next check this much later
 
 # --------------------------------------------------
 
+T_AUDIO_SEEK  = tracing.register("audio.seek", "audio", arg="target_s")
+T_AUDIO_DRIFT = tracing.register("audio.drift_ms", "audio")
+
 
 class AudioPlayer:
-    def __init__(self, filename: str):
+    default_latency = MPV_LATENCY     # used when the config has no latency.audio
+
+    def __init__(self, filename: str, latency: Optional[float] = None,
+                 cache: Optional["AudioCache"] = None):
         self.filename = filename
+        self.latency  = MPV_LATENCY if latency is None else latency
+        self.cache    = cache
+        self._resolved: dict[str, str] = {}   # source → file mpv plays
 
-        self.player = MPV(input_default_bindings=True)
+        self._player = None                 # MPV, created on first use
+        self._player_lock = threading.Lock()
         self._follower: Optional[ClockSource] = None
 
         self._thr:   Optional[threading.Thread] = None
@@ -46,6 +62,59 @@ class AudioPlayer:
 
         self._last_seek  = 0.0      # monotonic time of last seek
         self._settle_until = 0.0    # time until which we ignore drift
+        self.drift = 0.0            # last measured player − master (s)
+
+    # ───────────────────────────────────────────────
+    @property
+    def player(self):
+        if self._player is None:
+            with self._player_lock:
+                if self._player is None:
+                    from mpv import MPV     # heavy: loads libmpv
+                    self._player = MPV(input_default_bindings=True)
+        return self._player
+
+    def warm_up(self) -> None:
+        """Create the mpv instance (and decode into the PCM cache) ahead of start()."""
+        self.player
+        if self.filename:
+            self.resolve(self.filename)
+
+    def resolve(self, filename: str) -> str:
+        """The file mpv actually plays: the PCM cache entry if caching is on."""
+        if not self.cache:
+            return filename
+        if filename not in self._resolved:
+            self._resolved[filename] = self.cache.prepare(filename)
+        return self._resolved[filename]
+
+    def latency_for(self, filename: str) -> float:
+        """Latency to compile `filename`'s sequence with when the config has none."""
+        return self.default_latency
+
+    def load(self, filename: str, latency: Optional[float] = None) -> None:
+        """Switch to another file, keeping the same mpv instance."""
+        self.stop()
+        self.filename = filename
+        if latency is not None:
+            self.latency = latency
+
+    def queue(self, filename: str) -> None:
+        """Append a file to mpv's playlist; it follows the current one gaplessly."""
+        self.player["gapless-audio"] = "yes"
+        self.player["prefetch-playlist"] = "yes"
+        self.player.playlist_append(self.resolve(filename))
+
+    def duration(self) -> Optional[float]:
+        """Length of the file currently loaded in mpv (None if unknown)."""
+        return self.player.duration
+
+    def seek(self, position: float) -> None:
+        try:
+            with tracing.span(T_AUDIO_SEEK, position):
+                self.player.seek(max(0.0, position), reference="absolute")
+        except Exception as e:
+            print("[Audio] seek error:", e)
 
     # ───────────────────────────────────────────────
     def start(self, follower: Optional[ClockSource] = None):
@@ -56,7 +125,7 @@ class AudioPlayer:
         # Capture master time *before* mpv buffering delay
         start_target = follower.get_time() if follower else 0.0
 
-        self.player.play(self.filename)
+        self.player.play(self.resolve(self.filename))
 
         # Wait until mpv publishes first time_pos
         while self.player.time_pos is None:
@@ -82,49 +151,52 @@ class AudioPlayer:
 
     # ───────────────────────────────────────────────
     def _sync_loop(self):
-        stable_interval = 1000.0   # slow check when in sync
-        active_interval = 0.25  # fast check when drift is big or adjusting
-
         while not self._stop_evt.is_set():
-            if self.player.time_pos is None or not self._follower:
-                time.sleep(active_interval)
-                continue
-
-            # Ignore drift while mpv is settling after a seek
-            now = time.monotonic()
-            if now < self._settle_until:
-                time.sleep(active_interval)
-                continue
-
-            player_pos = (self.player.time_pos or 0.0) - MPV_LATENCY
-            master_time = self._follower.get_time()
-            drift = player_pos - master_time
-
-            print(f"[Audio] Master={master_time:.2f}s  "
-                f"Player={player_pos:.2f}s  Drift={drift:+.3f}s")
-
-            if abs(drift) < SEEK_THRESHOLD:
-                time.sleep(stable_interval)
-                continue
-
-            cooldown_ok = (now - self._last_seek) >= SEEK_COOLDOWN
-            large_drift = abs(drift) > LARGE_DRIFT
-
-            if not cooldown_ok and not large_drift:
-                time.sleep(stable_interval)
-                continue
-
-            # Perform seek
-            target = master_time + PREDICTIVE_LEAD
-            print(f"[Audio] SEEK  drift {drift:+.3f}s → {target:.2f}s")
-            try:
+            self._stop_evt.wait(self._sync_step(time.monotonic()))
+
+    def _sync_step(self, now: float) -> float:
+        """
+        One check of the follower sync loop at local time `now`: measure the
+        drift and seek if it calls for it.  Returns the wait before the next
+        check.  (piplayer-syncsim drives this against a simulated mpv.)
+        """
+        if self.player.time_pos is None or not self._follower:
+            return SYNC_POLL
+
+        # Ignore drift while mpv is settling after a seek
+        if now < self._settle_until:
+            return SYNC_POLL
+
+        player_pos = (self.player.time_pos or 0.0) - self.latency
+        master_time = self._follower.get_time()
+        drift = player_pos - master_time
+        self.drift = drift
+        tracing.counter(T_AUDIO_DRIFT, drift * 1000)
+
+        print(f"[Audio] Master={master_time:.2f}s  "
+            f"Player={player_pos:.2f}s  Drift={drift:+.3f}s")
+
+        if abs(drift) < SEEK_THRESHOLD:
+            return STABLE_POLL
+
+        cooldown_ok = (now - self._last_seek) >= SEEK_COOLDOWN
+        large_drift = abs(drift) > LARGE_DRIFT
+
+        if not cooldown_ok and not large_drift:
+            return STABLE_POLL
+
+        # Perform seek
+        target = master_time + PREDICTIVE_LEAD
+        print(f"[Audio] SEEK  drift {drift:+.3f}s → {target:.2f}s")
+        try:
+            with tracing.span(T_AUDIO_SEEK, target):
                 self.player.seek(target, reference="absolute")
-                self._last_seek = now
-                self._settle_until = now + SEEK_SETTLE
-            except Exception as e:
-                print("[Audio] seek error:", e)
+            self._last_seek = now
+            self._settle_until = now + SEEK_SETTLE
+        except Exception as e:
+            print("[Audio] seek error:", e)
 
-            time.sleep(active_interval)
+        return SYNC_POLL
 
 
     # ───────────────────────────────────────────────
@@ -133,15 +205,41 @@ class AudioPlayer:
             self._stop_evt.set()
             self._thr.join()
             self._thr = None
+        if self._player is None:            # never started: don't create mpv just to stop it
+            return
         try:
-            self.player.command("stop")
+            self._player.command("stop")
         except Exception:
             pass
 
     def wait_done(self):
-        while self.player.time_pos is not None:
+        if self._player is None:
+            return
+        while self._player.time_pos is not None:
             time.sleep(0.1)
 
     def is_playing(self):
-        return self.player.time_pos is not None
-
+        return self._player is not None and self._player.time_pos is not None
+
+
+# ───────── backend selection ──────────────────────
+AUDIO_BACKENDS = ("mpv", "pcm")
+
+
+def create_audio_player(backend: str, filename: str, latency: Optional[float] = None,
+                        cache: Optional["AudioCache"] = None, sink: str = "alsa"):
+    """
+    AudioPlayer (mpv, any format) or PCMPlayer (wav only, sample clock).
+    Both expose load/queue/start/seek/stop/is_playing/wait_done/duration,
+    `latency` and `drift`; PCMPlayer also has get_time().
+    """
+    if backend == "mpv":
+        return AudioPlayer(filename, latency=latency, cache=cache)
+    if backend == "pcm":
+        from .pcm_player import PCMPlayer, make_sink
+        if cache is None:
+            # wav passes through untouched, anything else is decoded once
+            from .audio_cache import AudioCache
+            cache = AudioCache()
+        return PCMPlayer(filename, cache=cache, sink=make_sink(sink))
+    raise ValueError(f"unknown audio backend: {backend} (choose from {AUDIO_BACKENDS})")
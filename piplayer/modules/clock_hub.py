@@ -0,0 +1,183 @@
+# modules/clock_hub.py
+"""
+Single-host clock hub: one network sync, many local players.
+
+`piplayer --clock-hub` runs the only SyncFollower on the machine and
+publishes its fit through a small memory-mapped file.  Players started
+with `--mode follower --via-hub` read master time from there instead of
+binding the sync port themselves, so they skip packet parsing and
+regression entirely and every instance on the box computes the exact
+same master time.
+
+Layout (float64, seqlock): [seq, a, b, valid, heartbeat, median_drift,
+active_master].  Master time = (time.monotonic() − b) / a; CLOCK_MONOTONIC
+is shared by all processes on a host, so no per-process offset is needed.
+
+Like SyncFollower, a HubClock keeps running on the last fit it saw when
+the hub goes away (players hold time instead of crashing); has_sync()
+turns False once the heartbeat is STALE_S old, and a restarted hub is
+picked up again.
+"""
+from __future__ import annotations
+
+import mmap
+import os
+import time
+from typing import Optional
+
+from .sync_network import SyncFollower
+
+CLOCK_HUB_PATH = ("/dev/shm/piplayer-clock" if os.path.isdir("/dev/shm")
+                  else "/tmp/piplayer-clock")
+PUBLISH_S      = 0.05     # hub → shared memory cadence
+STALE_S        = 2.0      # no heartbeat for this long → hub gone
+REOPEN_S       = 0.5      # hub gone: look for it again at most this often
+_FIELDS        = 7
+_SIZE          = _FIELDS * 8
+
+
+class _Shared:
+    def __init__(self, path: str, create: bool):
+        if create:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            os.ftruncate(fd, _SIZE)
+            self._map = mmap.mmap(fd, _SIZE)
+        else:
+            fd = os.open(path, os.O_RDONLY)
+            self._map = mmap.mmap(fd, _SIZE, access=mmap.ACCESS_READ)
+        os.close(fd)
+        self.v = memoryview(self._map).cast("d")
+
+    def read(self) -> tuple:
+        v = self.v
+        while True:
+            seq = v[0]
+            fields = tuple(v[1:_FIELDS])
+            if seq == v[0] and not int(seq) & 1:
+                return fields
+
+    def close(self) -> None:
+        self.v.release()
+        self._map.close()
+
+
+class ClockHub:
+    """Runs the host's SyncFollower and publishes its fit."""
+
+    def __init__(self, path: str = CLOCK_HUB_PATH):
+        self.path = path
+        self.follower = SyncFollower()
+        self._shm: Optional[_Shared] = None
+
+    def _publish(self) -> None:
+        f, v = self.follower, self._shm.v
+        a, b, valid = f.fit()
+        v[0] += 1
+        v[1] = a
+        v[2] = f._t0 + b                    # local fit → absolute monotonic
+        v[3] = valid
+        v[4] = time.monotonic()
+        v[5] = f.median_drift()
+        v[6] = 1.0 if f.has_active_master() else 0.0
+        v[0] += 1
+
+    def serve(self) -> None:
+        if _hub_alive(self.path):
+            raise SystemExit(f"[ClockHub] another hub is publishing on {self.path}")
+        self._shm = _Shared(self.path, create=True)
+        self.follower.start()
+        print(f"[ClockHub] Publishing master time on {self.path}")
+        locked = False
+        try:
+            while True:
+                self._publish()
+                if self.follower.has_sync() != locked:
+                    locked = not locked
+                    print("[ClockHub] ✅ Sync lock acquired." if locked
+                          else "[ClockHub] ❌ Sync lost.")
+                time.sleep(PUBLISH_S)
+        except KeyboardInterrupt:
+            print("\n[ClockHub] Stopping…")
+        finally:
+            # the fit stays valid: readers keep extrapolating from it and
+            # notice the missing heartbeat after STALE_S
+            self.follower.stop()
+            self._shm.close()
+            try:
+                os.unlink(self.path)
+            except OSError:
+                pass
+
+
+def _hub_alive(path: str) -> bool:
+    try:
+        shm = _Shared(path, create=False)
+    except OSError:
+        return False
+    try:
+        return time.monotonic() - shm.read()[3] < STALE_S
+    finally:
+        shm.close()
+
+
+class HubClock:
+    """SyncFollower stand-in that reads master time published by a ClockHub."""
+
+    def __init__(self, path: str = CLOCK_HUB_PATH):
+        self.path = path
+        self._shm: Optional[_Shared] = None
+        self._fit: Optional[tuple[float, float]] = None    # last valid (a, b)
+        self._reopen_at = 0.0
+        self.running = False
+
+    def start(self) -> None:
+        self.running = True
+        print(f"[HubClock] Reading master time from {self.path}")
+
+    def _fields(self) -> Optional[tuple]:
+        # called on the worker's timing path: while the hub is away, only
+        # every REOPEN_S is a file opened; get_time() runs on the last fit
+        now = time.monotonic()
+        if self._shm is None:
+            if now < self._reopen_at:
+                return None
+            self._reopen_at = now + REOPEN_S
+            try:
+                self._shm = _Shared(self.path, create=False)   # hub may start later
+            except OSError:
+                return None
+        fields = self._shm.read()
+        if fields[2]:
+            self._fit = (fields[0], fields[1])
+        if now - fields[3] >= STALE_S:
+            # hub gone or restarted (new file): map it again later
+            self._shm.close()
+            self._shm = None
+        return fields
+
+    def get_time(self) -> float:
+        self._fields()
+        if self._fit is None:
+            raise RuntimeError("[HubClock] No valid sync from the clock hub.")
+        a, b = self._fit
+        return (time.monotonic() - b) / a
+
+    get_synced_time = get_time
+
+    def has_sync(self) -> bool:
+        fields = self._fields()
+        return bool(fields and fields[2] and time.monotonic() - fields[3] < STALE_S)
+
+    def has_active_master(self) -> bool:
+        fields = self._fields()
+        return bool(fields and fields[5] and time.monotonic() - fields[3] < STALE_S)
+
+    def median_drift(self) -> float:
+        fields = self._fields()
+        return fields[4] if fields else 0.0
+
+    def stop(self) -> None:
+        self.running = False
+        if self._shm:
+            self._shm.close()
+            self._shm = None
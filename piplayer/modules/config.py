@@ -0,0 +1,87 @@
+# modules/config.py
+"""
+Player configuration (config.json, as written by `piplayer-setup`).
+
+    {
+        "track_mappings": {"Lights": "GPIO", "Par": "DMX"},
+        "latency": {
+            "audio":    0.30,                          # seconds, mpv output
+            "backends": {"GPIO": 0.015, "DMX": 0.001}, # seconds per output type
+            "tracks":   {"Lights": 0.020}              # per-track override
+        },
+        "audio_cache": {"max_mb": 512, "sample_rate": 48000}   # see audio_cache.py
+    }
+
+All latencies are in seconds and describe how long after the command the
+output is actually seen/heard.  They are applied once, when the sequence
+is compiled, never at fire time.
+"""
+from __future__ import annotations
+
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
+
+DEFAULT_BACKEND = "GPIO"       # tracks without a mapping still go to GPIO
+EMPTY_TRACK     = "--empty--"  # how piplayer-setup stores unnamed tracks
+
+
+def track_key(track: str) -> str:
+    """Normalise a track name the same way piplayer-setup does."""
+    return track if track.strip() else EMPTY_TRACK
+
+
+@dataclass
+class PlayerConfig:
+    track_mappings:  Dict[str, str]   = field(default_factory=dict)
+    audio_latency:   Optional[float]  = None   # None → AudioPlayer default
+    backend_latency: Dict[str, float] = field(default_factory=dict)
+    track_latency:   Dict[str, float] = field(default_factory=dict)
+    audio_cache:     Optional[dict]   = None   # settings block, None = disabled
+
+    # -----------------------------------------------------------------
+    @classmethod
+    def load(cls, path: Optional[str]) -> "PlayerConfig":
+        if not path:
+            return cls()
+        with open(path) as f:
+            data = json.load(f)
+        return cls.from_dict(data)
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "PlayerConfig":
+        latency = data.get("latency", {})
+        audio = latency.get("audio")
+        cache = data.get("audio_cache")
+        if cache is not None and not cache.get("enabled", True):
+            cache = None
+        return cls(
+            track_mappings  = dict(data.get("track_mappings", {})),
+            audio_latency   = float(audio) if audio is not None else None,
+            backend_latency = {k: float(v) for k, v in latency.get("backends", {}).items()},
+            track_latency   = {k: float(v) for k, v in latency.get("tracks", {}).items()},
+            audio_cache     = cache,
+        )
+
+    # -----------------------------------------------------------------
+    def backend_for(self, track: str) -> str:
+        return self.track_mappings.get(track_key(track), DEFAULT_BACKEND)
+
+    def output_latency(self, track: str) -> float:
+        """Seconds between firing an event on `track` and it taking effect."""
+        key = track_key(track)
+        if key in self.track_latency:
+            return self.track_latency[key]
+        return self.backend_latency.get(self.backend_for(track), 0.0)
+
+    def offset_for(self, audio_shift: float = 0.0) -> Callable[[str], float]:
+        """
+        Per-track schedule shift for SequenceLoader.compile(): later by the
+        audio latency (`audio_shift`), earlier by the output's own latency.
+        """
+        return lambda track: audio_shift - self.output_latency(track)
+
+    def min_offset(self, audio_shift: float = 0.0) -> float:
+        """Lowest value offset_for(audio_shift) can return, for any track."""
+        latencies = [0.0, *self.backend_latency.values(), *self.track_latency.values()]
+        return audio_shift - max(latencies)
@@ -0,0 +1,315 @@
+# modules/cue_list.py
+"""
+Cue lists: play an ordered list of audio + sequence pairs without gaps.
+
+    {
+        "repeat": true,                                  # wrap around at the end
+        "items": [
+            {"audio": "intro.wav", "sequence": "intro.mid"},
+            {"audio": "loop.wav",  "sequence": "loop.mid", "loops": 4},
+            {"sequence": "dark.mid", "trigger": "wait"},
+            {"audio": "outro.wav", "config": "outro.json"}
+        ]
+    }
+
+``trigger`` says how an item starts once the previous one is over:
+"follow" (default) starts it right away, "wait" holds until next() is
+called (Enter key, daemon `next` command, trigger input …).
+
+While an item plays, the one after it is compiled and loaded into the
+sequence worker in a background thread, its audio is queued behind the
+current file (mpv playlist or the pcm backend's queue, both gapless) and
+the worker is told the exact hand-over time, so neither side waits for
+the main loop at the boundary.
+"""
+from __future__ import annotations
+
+import json
+import os
+import select
+import sys
+import threading
+import time
+import wave
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .audio_cache import AudioCache
+from .audio_player import AudioPlayer, MPV_LATENCY, create_audio_player
+from .config import PlayerConfig
+from .sequence_loader import SequenceLoader
+from .sequence_process import SequenceWorker
+
+TRIGGERS = ("follow", "wait")
+TICK_S   = 0.02
+
+
+@dataclass
+class Cue:
+    name:     str
+    audio:    Optional[str]   = None
+    sequence: Optional[str]   = None
+    config:   PlayerConfig    = field(default_factory=PlayerConfig)
+    loops:    int             = 1
+    trigger:  str             = "follow"
+    duration: Optional[float] = None      # explicit length (sequence-only items)
+    prepared: bool            = False
+
+
+def load_cue_list(path: str, prefix: str = "") -> tuple[list[Cue], bool]:
+    """
+    Read a cue list; returns (cues, repeat).  Paths are relative to the file;
+    `prefix` keeps schedule names unique when several lists share a worker.
+    """
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(p):
+        return os.path.join(base, p) if p else None
+
+    with open(path) as f:
+        data = json.load(f)
+    cues = []
+    for i, item in enumerate(data.get("items", [])):
+        trigger = item.get("trigger", "follow")
+        if trigger not in TRIGGERS:
+            raise ValueError(f"cue {i}: trigger must be one of {TRIGGERS}")
+        duration = item.get("duration")
+        cues.append(Cue(
+            name     = f"{prefix}cue-{i}",
+            audio    = resolve(item.get("audio")),
+            sequence = resolve(item.get("sequence")),
+            config   = PlayerConfig.load(resolve(item.get("config"))),
+            loops    = max(int(item.get("loops", 1)), 1),
+            trigger  = trigger,
+            duration = float(duration) if duration is not None else None,
+        ))
+    return cues, bool(data.get("repeat", False))
+
+
+def audio_duration(path: str) -> Optional[float]:
+    """Length of an audio file without decoding it (wav header, else ffprobe)."""
+    try:
+        with wave.open(path) as w:
+            return w.getnframes() / w.getframerate()
+    except (wave.Error, EOFError, OSError):
+        pass
+    try:
+        from pydub.utils import mediainfo
+        return float(mediainfo(path)["duration"])
+    except Exception:
+        return None
+
+
+class CueEngine:
+    """
+    Runs a cue list on a shared AudioPlayer and SequenceWorker (local clock).
+    Call tick() regularly; it only does bookkeeping, the hand-overs happen
+    inside mpv and the worker.
+    """
+
+    def __init__(self, cues: list[Cue], worker: SequenceWorker,
+                 audio: Optional[AudioPlayer] = None, repeat: bool = False):
+        self.cues = cues
+        self.worker = worker
+        self.audio = audio
+        self.repeat = repeat
+
+        self.current: Optional[tuple[int, int]] = None   # (cue index, loop)
+        self.queued:  Optional[tuple[int, int]] = None   # handed over at seg_end
+        self.waiting: Optional[int] = None               # cue held by a "wait"
+        self.seg_start = 0.0
+        self.seg_end = 0.0
+        self.done = False
+
+        self._prepare_lock = threading.Lock()
+        self._prefetch: Optional[threading.Thread] = None
+
+    # ───────────────────────── preparation ─────────────────────────
+    def prepare(self, cue: Cue) -> None:
+        """Compile the cue into the worker and measure it (idempotent)."""
+        with self._prepare_lock:
+            if cue.prepared:
+                return
+            seq_len = 0.0
+            if cue.sequence:
+                sequence = SequenceLoader(cue.sequence)
+                seq_len = max((ev.time_s for ev in sequence.events), default=0.0)
+                audio_shift = self._audio_latency(cue) if cue.audio else 0.0
+                self.worker.load(cue.name, sequence.compile(cue.config.offset_for(audio_shift)))
+            # the file mpv will play (decoded into the PCM cache if enabled)
+            source = self.audio.resolve(cue.audio) if cue.audio and self.audio else cue.audio
+            if cue.duration is None:
+                cue.duration = audio_duration(source) if source else seq_len
+            if source:
+                with open(source, "rb") as f:         # warm the page cache
+                    while f.read(1 << 20):
+                        pass
+            cue.prepared = True
+
+    def _audio_latency(self, cue: Cue) -> float:
+        latency = cue.config.audio_latency
+        if latency is None:
+            latency = self.audio.latency_for(cue.audio) if self.audio else MPV_LATENCY
+        return latency
+
+    def _following(self, seg: tuple[int, int]) -> Optional[tuple[int, int]]:
+        idx, loop = seg
+        if loop + 1 < self.cues[idx].loops:
+            return idx, loop + 1
+        if idx + 1 < len(self.cues):
+            return idx + 1, 0
+        return (0, 0) if self.repeat else None
+
+    def _prefetch_next(self) -> None:
+        """Prepare the following segment and queue it for seg_end (background)."""
+        nxt = self._following(self.current)
+        if nxt is None or (nxt[1] == 0 and self.cues[nxt[0]].trigger == "wait"):
+            self.queued = None
+            return
+        self.queued = nxt
+        cue, boundary = self.cues[nxt[0]], self.seg_end
+        current_audio = self.cues[self.current[0]].audio
+
+        def run():
+            self.prepare(cue)
+            # a cue without a sequence hands over to an empty schedule
+            self.worker.queue(cue.name if cue.sequence else "", boundary)
+            if cue.audio and current_audio and self.audio:
+                self.audio.queue(cue.audio)
+
+        self._prefetch = threading.Thread(target=run, daemon=True)
+        self._prefetch.start()
+
+    def _join_prefetch(self) -> None:
+        if self._prefetch:
+            self._prefetch.join()
+            self._prefetch = None
+
+    # ─────────────────────────── control ───────────────────────────
+    def start(self, index: int = 0) -> None:
+        """Start cue `index` now, cutting whatever is playing."""
+        self._join_prefetch()
+        cue = self.cues[index]
+        self.prepare(cue)
+
+        if self.audio:
+            if cue.audio:
+                self.audio.load(cue.audio, self._audio_latency(cue))
+                self.audio.start()
+            else:
+                self.audio.stop()
+        self._begin((index, 0), time.monotonic(), restart_worker=True)
+
+    def _begin(self, seg: tuple[int, int], start: float, restart_worker: bool) -> None:
+        cue = self.cues[seg[0]]
+        if restart_worker:
+            if cue.sequence:
+                self.worker.play(cue.name, start)
+            else:
+                self.worker.stop()
+        duration = cue.duration
+        if not duration and cue.audio and self.audio:
+            duration = self.audio.duration() or 0.0        # non-wav fallback
+        self.current, self.waiting, self.done = seg, None, False
+        self.seg_start, self.seg_end = start, start + (duration or 0.0)
+        print(f"[Cues] ▶ {seg[0]} ({os.path.basename(cue.audio or cue.sequence or '-')}) "
+              f"loop {seg[1] + 1}/{cue.loops}")
+        self._prefetch_next()
+
+    def next(self) -> None:
+        """Start the held cue, or cut to the next cue if one is playing."""
+        if self.waiting is not None:
+            self.start(self.waiting)
+            return
+        if self.current is None:
+            self.start(0)
+            return
+        idx = self.current[0] + 1
+        if idx >= len(self.cues):
+            if not self.repeat:
+                self.stop()
+                return
+            idx = 0
+        self.start(idx)
+
+    def stop(self) -> None:
+        self._join_prefetch()
+        if self.audio:
+            self.audio.stop()
+        self.worker.stop()
+        self.current = self.queued = self.waiting = None
+        self.done = True
+
+    def tick(self) -> None:
+        """Advance the bookkeeping once the current segment is over."""
+        if self.current is None or time.monotonic() < self.seg_end:
+            return
+        if self.queued is not None:
+            self._join_prefetch()
+            seg = self.queued
+            cue = self.cues[seg[0]]
+            prev_audio = self.cues[self.current[0]].audio
+            # audio after a silent cue can't be pre-queued in mpv: start it now
+            if cue.audio and self.audio and not prev_audio:
+                self.audio.load(cue.audio, self._audio_latency(cue))
+                self.audio.start()
+            self._begin(seg, self.seg_end, restart_worker=False)
+            return
+
+        nxt = self._following(self.current)
+        self.current = None
+        if nxt is None:
+            print("[Cues] ■ end of list")
+            self.done = True
+        else:
+            print(f"[Cues] ⏸ waiting to start cue {nxt[0]}")
+            self.waiting = nxt[0]
+
+    def snapshot(self) -> dict:
+        cue = self.cues[self.current[0]] if self.current else None
+        return {
+            "cue":     self.current[0] if self.current else None,
+            "loop":    self.current[1] if self.current else 0,
+            "waiting": self.waiting,
+            "pos":     round(time.monotonic() - self.seg_start, 3) if cue else 0.0,
+            "total":   (self.seg_end - self.seg_start) if cue else 0.0,
+            "audio":   cue.audio if cue else None,
+            "sequence": cue.sequence if cue else None,
+        }
+
+
+# -------------------------------------------------------------------- #
+def play_cue_list(path: str, cache: Optional[AudioCache] = None,
+                  audio_backend: str = "mpv", pcm_sink: str = "alsa") -> None:
+    """Foreground runner for `piplayer --cues`: Enter = next, Ctrl-C = stop."""
+    cues, repeat = load_cue_list(path)
+    if not cues:
+        print("No items in cue list!")
+        return
+
+    worker = SequenceWorker(time.monotonic)       # fork before mpv starts
+    worker.start()
+    audio = None
+    if any(c.audio for c in cues):
+        audio = create_audio_player(audio_backend, "", cache=cache, sink=pcm_sink)
+    if audio:
+        audio.warm_up()
+
+    engine = CueEngine(cues, worker, audio, repeat)
+    print(f"[Cues] {len(cues)} items – press Enter for next")
+    inputs = [sys.stdin]
+    try:
+        engine.start(0)
+        while not engine.done:
+            readable, _, _ = select.select(inputs, [], [], TICK_S)
+            if readable:
+                if sys.stdin.readline():
+                    engine.next()
+                else:
+                    inputs = []          # stdin closed: follow triggers only
+            engine.tick()
+    except KeyboardInterrupt:
+        print("\nStopping playback…")
+    finally:
+        engine.stop()
+        worker.close()
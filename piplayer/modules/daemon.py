@@ -0,0 +1,471 @@
+# modules/daemon.py
+"""
+Resident player (`piplayer --daemon`).
+
+One audio player (mpv or pcm), one sequence worker and one GPIO setup stay alive for
+the lifetime of the process.  Shows listed in a shows file are compiled
+and handed to the worker up front (their audio is read once to warm the
+page cache), so switching is just a couple of commands.
+
+Shows file:
+
+    {
+        "preload": ["intro", "main"],            # optional, default: all
+        "shows": {
+            "intro": {"audio": "intro.wav", "sequence": "intro.mid",
+                      "config": "config.json", "loop": false},
+            "main":  {"audio": "main.wav",  "sequence": "main.mid", "loop": true},
+            "tour":  {"cues": "tour.json"}               # a cue list (cue_list.py)
+        },
+        "triggers": {                                    # optional GPIO inputs
+            "17": "play intro",
+            "27": {"action": "next", "edge": "falling", "pull": "up", "debounce": 0.2}
+        }
+    }
+
+Paths are relative to the shows file.  Control it over a Unix socket, one
+text command per connection, one JSON reply:
+
+    play [name] | switch name | next | stop | seek seconds | status | list |
+    trigger pin | quit
+
+A trigger runs its action as if it came over the socket, handled by the
+main loop as soon as the edge arrives (a pipe wakes it up).  `trigger pin`
+simulates an edge on an input pin, e.g. off the Pi.  For every trigger
+that starts a show the daemon reports the time from the edge to the
+show's first GPIO event (minus where that event sits in the show).
+"""
+from __future__ import annotations
+
+import json
+import os
+import select
+import socket
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .audio_cache import AudioCache
+from .audio_player import AudioPlayer, MPV_LATENCY, create_audio_player
+from .config import PlayerConfig
+from .gpio_driver import GPIOInputs, DEBOUNCE_S
+from .cue_list import CueEngine, load_cue_list
+from .sequence_loader import SequenceLoader
+from .sequence_process import SequenceWorker
+from .status import StatusPublisher, SequenceStatus, STATUS_SOCKET, PUBLISH_HZ
+from . import tracing
+
+CONTROL_SOCKET = "/tmp/piplayer.sock"
+TICK_S         = 0.05      # end-of-show / loop check and status cadence
+WARM_CHUNK     = 1 << 20
+FIRST_EVENT_TIMEOUT_S = 5.0   # stop waiting for a triggered show's first event
+
+_T_TRIGGER = tracing.register("trigger", "input", arg="pin")
+_T_TRIGGER_LAT = tracing.register("trigger.first_event_ms", "input")
+
+
+@dataclass
+class Show:
+    name:     str
+    audio:    Optional[str] = None
+    sequence: Optional[str] = None
+    cues:     Optional[str] = None
+    config:   PlayerConfig  = field(default_factory=PlayerConfig)
+    loop:     bool          = False
+    duration: float         = 0.0
+    loaded:   bool          = False
+    lead:     float         = 0.0      # time of the first compiled event
+
+
+def load_shows(path: str) -> tuple[dict[str, Show], list[str]]:
+    """Read a shows file; returns (shows by name, names to preload)."""
+    base = os.path.dirname(os.path.abspath(path))
+
+    def resolve(p):
+        return os.path.join(base, p) if p else None
+
+    with open(path) as f:
+        data = json.load(f)
+    shows = {}
+    for name, spec in data.get("shows", {}).items():
+        shows[name] = Show(
+            name     = name,
+            audio    = resolve(spec.get("audio")),
+            sequence = resolve(spec.get("sequence")),
+            cues     = resolve(spec.get("cues")),
+            config   = PlayerConfig.load(resolve(spec.get("config"))),
+            loop     = bool(spec.get("loop", False)),
+        )
+    preload = data.get("preload", list(shows))
+    return shows, preload
+
+
+def load_triggers(path: str) -> dict[int, dict]:
+    """The shows file's "triggers" block: pin → {action, edge, pull, debounce}."""
+    with open(path) as f:
+        data = json.load(f)
+    triggers = {}
+    for pin, spec in data.get("triggers", {}).items():
+        if isinstance(spec, str):
+            spec = {"action": spec}
+        triggers[int(pin)] = {
+            "action":   spec["action"],
+            "edge":     spec.get("edge", "falling"),
+            "pull":     spec.get("pull", "up"),
+            "debounce": float(spec.get("debounce", DEBOUNCE_S)),
+        }
+    return triggers
+
+
+def uses_audio(show: Show) -> bool:
+    """Whether the show, or any item of its cue list, plays an audio file."""
+    if show.audio:
+        return True
+    return bool(show.cues) and any(cue.audio for cue in load_cue_list(show.cues)[0])
+
+
+def warm_file(path: str) -> None:
+    """Read a file once so the first play comes from the page cache."""
+    with open(path, "rb") as f:
+        while f.read(WARM_CHUNK):
+            pass
+
+
+def send_command(command: str, path: str = CONTROL_SOCKET) -> dict:
+    """Client side: send one command to a running daemon, return its reply."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.connect(path)
+        sock.sendall(command.encode() + b"\n")
+        data = b""
+        while not data.endswith(b"\n"):
+            chunk = sock.recv(4096)
+            if not chunk:
+                break
+            data += chunk
+    return json.loads(data.decode() or "{}")
+
+
+class PlayerDaemon:
+    def __init__(
+        self,
+        shows_file: str,
+        socket_path: str = CONTROL_SOCKET,
+        status_socket: str = STATUS_SOCKET,
+        status_rate: float = PUBLISH_HZ,
+        cache: Optional[AudioCache] = None,
+        audio_backend: str = "mpv",
+        pcm_sink: str = "alsa",
+    ):
+        self.shows, preload = load_shows(shows_file)
+        self.socket_path = socket_path
+
+        self.current: Optional[Show] = None
+        self.engines: dict[str, CueEngine] = {}
+        self.playing = False
+        self.cycle_start = 0.0
+        self.loop_count = 0
+
+        # worker first: fork before libmpv spawns its threads
+        self.seq_status = SequenceStatus()
+        self.worker = SequenceWorker(time.monotonic, self.seq_status)
+        self.worker.start()
+
+        self.audio: Optional[AudioPlayer] = None
+        if any(uses_audio(show) for show in self.shows.values()):
+            self.audio = create_audio_player(audio_backend, "", cache=cache, sink=pcm_sink)
+            self.audio.warm_up()
+
+        self.status: Optional[StatusPublisher] = None
+        if status_rate > 0:
+            self.status = StatusPublisher(status_socket, status_rate)
+
+        for name in preload:
+            if name in self.shows:
+                self._prepare(self.shows[name])
+
+        # after the fork: RPi.GPIO's interrupt thread must live in this process
+        self.triggers = load_triggers(shows_file)
+        self.inputs: Optional[GPIOInputs] = None
+        self._edges: deque = deque()
+        self._wake_r, self._wake_w = os.pipe()
+        os.set_blocking(self._wake_w, False)
+        self._awaiting: Optional[tuple] = None           # (edge t, pin, show lead)
+        self.trigger_latency = [None, 0.0]               # [last, max] seconds
+        if self.triggers:
+            self.inputs = GPIOInputs(self._on_edge)
+            for pin, spec in self.triggers.items():
+                self.inputs.add(pin, spec["edge"], spec["pull"], spec["debounce"])
+        print(f"[Daemon] {len(self.shows)} shows, preloaded: "
+              f"{[n for n, s in self.shows.items() if s.loaded]}")
+
+    # ─────────────────────────────────────────────────────────
+    def _prepare(self, show: Show) -> None:
+        """Compile the show's sequence into the worker and warm its audio."""
+        if show.loaded:
+            return
+        if show.cues:
+            cues, repeat = load_cue_list(show.cues, prefix=f"{show.name}/")
+            engine = CueEngine(cues, self.worker, self.audio, repeat)
+            if cues:
+                engine.prepare(cues[0])     # the rest is prefetched while playing
+            self.engines[show.name] = engine
+        if show.sequence:
+            sequence = SequenceLoader(show.sequence)
+            show.duration = max((ev.time_s for ev in sequence.events), default=0.0)
+            audio_shift = self._audio_latency(show) if show.audio else 0.0
+            schedule = sequence.compile(show.config.offset_for(audio_shift))
+            show.lead = schedule[0].time_s if schedule else 0.0
+            self.worker.load(show.name, schedule)
+        if show.audio and self.audio:
+            warm_file(self.audio.resolve(show.audio))   # decodes into the PCM cache
+        show.loaded = True
+
+    def _audio_latency(self, show: Show) -> float:
+        latency = show.config.audio_latency
+        if latency is None:
+            latency = self.audio.latency_for(show.audio) if self.audio else MPV_LATENCY
+        return latency
+
+    # ─────────────────────── commands ───────────────────────
+    def play(self, name: Optional[str] = None, edge: float = 0.0) -> dict:
+        show = self.shows.get(name) if name else self.current
+        if show is None:
+            return {"ok": False, "error": f"unknown show: {name}"}
+        self._prepare(show)
+        self._stop_engine()
+
+        if show.cues:
+            engine = self.engines[show.name]
+            if not engine.cues:
+                return {"ok": False, "error": f"empty cue list: {show.name}"}
+            engine.start(0)
+        else:
+            if self.audio:
+                if show.audio:
+                    self.audio.load(show.audio, self._audio_latency(show))
+                    self.audio.start()
+                else:
+                    self.audio.stop()
+
+            self.cycle_start = time.monotonic()
+            if show.sequence:
+                self.worker.play(show.name, self.cycle_start, edge)
+            else:
+                self.worker.stop()
+
+        if show is not self.current:
+            self.loop_count = 0
+        self.current = show
+        self.playing = True
+        return {"ok": True, "show": show.name}
+
+    def _engine(self) -> Optional[CueEngine]:
+        return self.engines.get(self.current.name) if self.current else None
+
+    def _stop_engine(self) -> None:
+        engine = self._engine()
+        if engine and not engine.done:
+            engine.stop()
+
+    def next(self) -> dict:
+        engine = self._engine()
+        if engine is None:
+            return {"ok": False, "error": "current show is not a cue list"}
+        engine.next()
+        self.playing = not engine.done
+        return {"ok": True, **engine.snapshot()}
+
+    def stop(self) -> dict:
+        self._stop_engine()
+        if self.audio:
+            self.audio.stop()
+        self.worker.stop()
+        self.playing = False
+        return {"ok": True}
+
+    def seek(self, position: float) -> dict:
+        if not self.playing:
+            return {"ok": False, "error": "not playing"}
+        if self.current.cues:
+            return {"ok": False, "error": "can't seek in a cue list"}
+        if self.audio and self.current.audio:
+            self.audio.seek(position)
+        self.cycle_start = time.monotonic() - position
+        self.worker.seek(self.cycle_start)
+        return {"ok": True, "pos": position}
+
+    def snapshot(self) -> dict:
+        show = self.current
+        engine = self._engine()
+        cue = engine.snapshot() if engine else {}
+        return {
+            "mode":     "daemon",
+            "show":     show.name if show else None,
+            "playing":  self.playing,
+            "audio":    cue["audio"] if engine else (show.audio if show else None),
+            "sequence": cue["sequence"] if engine else (show.sequence if show else None),
+            "pos":      cue["pos"] if engine else
+                        (round(time.monotonic() - self.cycle_start, 3) if self.playing else 0.0),
+            "total":    cue["total"] if engine else (show.duration if show else 0.0),
+            "loop":     cue["loop"] if engine else self.loop_count,
+            "cue":      cue.get("cue"),
+            "waiting":  cue.get("waiting"),
+            "drift":    None,
+            "sync":     None,
+            "late":     self.seq_status.lateness[0],
+            "late_max": self.seq_status.lateness[1],
+            "pins":     self.seq_status.active_pins(),
+            "trigger":  self.trigger_latency[0],
+        }
+
+    # ─────────────────────── triggers ───────────────────────
+    def _on_edge(self, pin: int, t: float) -> None:
+        # interrupt thread: queue it and wake the main loop, nothing else
+        self._edges.append((pin, t))
+        try:
+            os.write(self._wake_w, b"!")
+        except BlockingIOError:
+            pass                        # pipe full: a wake-up is pending anyway
+
+    def _run_triggers(self) -> None:
+        os.read(self._wake_r, 4096)
+        while self._edges:
+            pin, t = self._edges.popleft()
+            tracing.instant(_T_TRIGGER, pin)
+            action = self.triggers[pin]["action"]
+            starts = action.split()[0].lower() in ("play", "switch")
+            reply = self.handle(action, edge=t)
+            handled = time.monotonic() - t
+            print(f"[Trigger] pin {pin} → {action!r} {reply} "
+                  f"(handled {handled * 1000:.2f} ms after the edge)")
+            show = self.current
+            if starts and reply.get("ok") and show and show.sequence and not show.cues:
+                self._awaiting = (t, pin, show.lead)
+
+    def _check_trigger_latency(self) -> None:
+        """Edge → first GPIO event of the triggered show, once it has fired."""
+        t_edge, pin, lead = self._awaiting
+        if self.seq_status.trigger[0] != t_edge:      # the worker hasn't fired it yet
+            if time.monotonic() - (t_edge + lead) > FIRST_EVENT_TIMEOUT_S:
+                self._awaiting = None
+            return
+        self._awaiting = None
+        latency = self.seq_status.trigger[1]
+        self.trigger_latency[0] = latency
+        self.trigger_latency[1] = max(self.trigger_latency[1], latency)
+        tracing.counter(_T_TRIGGER_LAT, latency * 1000)
+        print(f"[Trigger] pin {pin}: first event {latency * 1000:.2f} ms after the edge "
+              f"(max {self.trigger_latency[1] * 1000:.2f} ms)")
+
+    def handle(self, line: str, edge: float = 0.0) -> dict:
+        parts = line.split()
+        if not parts:
+            return {"ok": False, "error": "empty command"}
+        cmd, args = parts[0].lower(), parts[1:]
+        try:
+            if cmd in ("play", "switch"):
+                if cmd == "switch" and not args:
+                    return {"ok": False, "error": "switch needs a show name"}
+                return self.play(args[0] if args else None, edge)
+            if cmd == "next":
+                return self.next()
+            if cmd == "stop":
+                return self.stop()
+            if cmd == "seek":
+                return self.seek(float(args[0]))
+            if cmd == "status":
+                return {"ok": True, **self.snapshot()}
+            if cmd == "trigger":
+                if not self.inputs or not self.inputs.inject(int(args[0])):
+                    return {"ok": False, "error": f"not a trigger input: {args[0]}"}
+                return {"ok": True, "pin": int(args[0])}
+            if cmd == "list":
+                return {"ok": True, "shows": {n: s.loaded for n, s in self.shows.items()}}
+            if cmd == "quit":
+                return {"ok": True, "quit": True}
+        except (IndexError, ValueError) as e:
+            return {"ok": False, "error": str(e)}
+        return {"ok": False, "error": f"unknown command: {cmd}"}
+
+    # ─────────────────────── main loop ───────────────────────
+    def _tick(self) -> None:
+        show = self.current
+        if not self.playing or show is None:
+            return
+        engine = self._engine()
+        if engine:
+            engine.tick()
+            self.playing = not engine.done
+            return
+        if show.audio and self.audio:
+            ended = not self.audio.is_playing()
+        else:
+            ended = time.monotonic() - self.cycle_start >= show.duration
+        if not ended:
+            return
+        if show.loop and (show.audio or show.duration > 0):
+            self.loop_count += 1
+            self.play(show.name)
+        else:
+            self.stop()
+
+    def _accept(self, server: socket.socket) -> bool:
+        """Serve one client; returns False when asked to quit."""
+        conn, _ = server.accept()
+        with conn:
+            conn.settimeout(1.0)
+            data = b""
+            try:
+                while not data.endswith(b"\n"):
+                    chunk = conn.recv(1024)
+                    if not chunk:
+                        break
+                    data += chunk
+            except socket.timeout:
+                pass
+            reply = self.handle(data.decode(errors="replace").strip())
+            print(f"[Daemon] {data.decode(errors='replace').strip()!r} → {reply}")
+            try:
+                conn.sendall(json.dumps(reply).encode() + b"\n")
+            except OSError:
+                pass
+        return not reply.get("quit")
+
+    def serve(self) -> None:
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        server.bind(self.socket_path)
+        server.listen(4)
+        print(f"[Daemon] Listening on {self.socket_path}")
+
+        try:
+            running = True
+            while running:
+                readable, _, _ = select.select([server, self._wake_r], [], [], TICK_S)
+                if self._wake_r in readable:
+                    self._run_triggers()
+                if server in readable:
+                    running = self._accept(server)
+                if self._awaiting:
+                    self._check_trigger_latency()
+                self._tick()
+                if self.status:
+                    self.status.maybe_publish(self.snapshot)
+        except KeyboardInterrupt:
+            print("\n[Daemon] Stopping…")
+        finally:
+            self.stop()
+            if self.inputs:
+                self.inputs.close()
+            os.close(self._wake_r)
+            os.close(self._wake_w)
+            self.worker.close()
+            server.close()
+            try:
+                os.unlink(self.socket_path)
+            except OSError:
+                pass
+            if self.status:
+                self.status.close()
@@ -1,13 +1,38 @@
 # modules/gpio_driver.py
+from __future__ import annotations
 
-try:
-    import RPi.GPIO as GPIO
-    GPIO.setmode(GPIO.BCM)  # Set mode early to trigger RuntimeError if not on Pi
-    GPIO.setwarnings(False)  # Disable warnings
-    GPIO_AVAILABLE = True
-except (ImportError, RuntimeError):
-    GPIO_AVAILABLE = False
-    print("⚠️  RPi.GPIO not available or not running on Raspberry Pi — using mock mode.")
+import threading
+import time
+from typing import Callable, Optional
+
+from .gpio_recorder import GPIORecorder, MARK_ALL_OFF
+
+DEBOUNCE_S = 0.05           # trigger inputs: edges closer than this are ignored
+EDGES      = ("falling", "rising", "both")
+PULLS      = ("up", "down", "off")
+
+GPIO = None
+_GPIO_AVAILABLE: Optional[bool] = None     # None = not probed yet
+
+
+def gpio_available() -> bool:
+    """
+    Import and initialise RPi.GPIO on first use (not at import time).
+    SequenceWorker.start() calls it in the parent before forking, so the
+    worker inherits the result and the warning is printed only once.
+    """
+    global GPIO, _GPIO_AVAILABLE
+    if _GPIO_AVAILABLE is None:
+        try:
+            import RPi.GPIO as _gpio
+            _gpio.setmode(_gpio.BCM)  # Set mode early to trigger RuntimeError if not on Pi
+            _gpio.setwarnings(False)  # Disable warnings
+            GPIO = _gpio
+            _GPIO_AVAILABLE = True
+        except (ImportError, RuntimeError):
+            _GPIO_AVAILABLE = False
+            print("⚠️  RPi.GPIO not available or not running on Raspberry Pi — using mock mode.")
+    return _GPIO_AVAILABLE
 
 
 class GPIODriver:
@@ -17,25 +42,61 @@ class GPIODriver:
     - Note number = GPIO pin
     - Velocity > 0 = ON (HIGH)
     - Note off or velocity = 0 = OFF (LOW)
+
+    Mock mode is silent per event; pass a GPIORecorder to keep the pin
+    changes (in mock mode or on real pins).  ``mock=True`` forces mock mode
+    even on a Pi.
     """
 
-    def __init__(self, pin_list: list[int]):
-        self.pins = sorted(set(pin_list))
-        self.mock = not GPIO_AVAILABLE
+    def __init__(self, pin_list: list[int], recorder: Optional[GPIORecorder] = None,
+                 mock: Optional[bool] = None):
+        self.pins: list[int] = []
+        self.mock = mock or not gpio_available()
+        self.recorder = recorder
+        self._warned: set[int] = set()
 
         if not self.mock:
             GPIO.setmode(GPIO.BCM)
-            for pin in self.pins:
+        self.add_pins(pin_list)
+
+    def add_pins(self, pin_list) -> None:
+        """Prepare extra output pins (LOW); already prepared pins are kept as is."""
+        new = sorted(set(pin_list) - set(self.pins))
+        if not new:
+            return
+        if not self.mock:
+            for pin in new:
                 GPIO.setup(pin, GPIO.OUT)
                 GPIO.output(pin, GPIO.LOW)
-            print(f"[Real GPIO] Prepared pins: {self.pins}")
+            print(f"[Real GPIO] Prepared pins: {new}")
         else:
-            print(f"[Mock GPIO] Prepared pins: {self.pins}")
+            print(f"[Mock GPIO] Prepared pins: {new}")
+        self.pins = sorted(self.pins + new)
+
+    def all_off(self) -> None:
+        """Drive every prepared pin LOW (recorded as one marker)."""
+        if not self.mock:
+            for pin in self.pins:
+                GPIO.output(pin, GPIO.LOW)
+        if self.recorder:
+            self.recorder.mark(MARK_ALL_OFF)
+
+    def mark(self, code: int, t: Optional[float] = None) -> None:
+        """Put a marker into the recording (no-op without a recorder)."""
+        if self.recorder:
+            self.recorder.mark(code, t)
+
+    def _unprepared(self, note: int) -> bool:
+        if note in self.pins:
+            return False
+        if note not in self._warned:              # once per note, not per event
+            self._warned.add(note)
+            print(f"[Warning] Note {note} not prepared")
+        return True
 
     def note_on(self, note: int, velocity: int) -> None:
         """Turn pin ON if velocity > 0, otherwise OFF."""
-        if note not in self.pins:
-            print(f"[Warning] Note {note} not prepared")
+        if self._unprepared(note):
             return
 
         if velocity > 0:
@@ -45,11 +106,14 @@ class GPIODriver:
 
     def note_off(self, note: int) -> None:
         """Turn pin OFF."""
-        if note not in self.pins:
-            print(f"[Warning] Note {note} not prepared")
+        if self._unprepared(note):
             return
         self._write(note, False)
 
+    def set(self, pin: int, level: bool) -> None:
+        """Drive a prepared pin to `level` directly (recorded like any event)."""
+        self._write(pin, level)
+
     def cleanup(self) -> None:
         """Cleanup GPIO state."""
         if not self.mock:
@@ -60,5 +124,60 @@ class GPIODriver:
     def _write(self, pin: int, state: bool) -> None:
         if not self.mock:
             GPIO.output(pin, GPIO.HIGH if state else GPIO.LOW)
-        else:
-            print(f"[Mock GPIO] Pin {pin}: {'HIGH' if state else 'LOW'}")
+        if self.recorder:
+            self.recorder.record(pin, state)
+
+
+class GPIOInputs:
+    """
+    Trigger inputs (push buttons, PIR sensors, contact closures).
+
+    Edges come from RPi.GPIO's interrupt thread (add_event_detect), never
+    from polling.  Debouncing is leading-edge and done here, so the first
+    edge fires at once and the bounce after it is dropped; mock inputs go
+    through the same path via ``inject(pin)``.  ``callback(pin, t)`` runs
+    on the interrupt thread with the monotonic edge time: keep it short.
+    """
+
+    def __init__(self, callback: Callable[[int, float], None], mock: Optional[bool] = None):
+        self.callback = callback
+        self.mock = mock or not gpio_available()
+        self.pins: dict[int, float] = {}           # pin → debounce seconds
+        self._last: dict[int, float] = {}
+        self._lock = threading.Lock()
+
+    def add(self, pin: int, edge: str = "falling", pull: str = "up",
+            debounce: float = DEBOUNCE_S) -> None:
+        if edge not in EDGES or pull not in PULLS:
+            raise ValueError(f"pin {pin}: edge must be one of {EDGES}, pull one of {PULLS}")
+        self.pins[pin] = debounce
+        self._last[pin] = float("-inf")
+        if not self.mock:
+            GPIO.setup(pin, GPIO.IN, pull_up_down={"up": GPIO.PUD_UP, "down": GPIO.PUD_DOWN,
+                                                   "off": GPIO.PUD_OFF}[pull])
+            GPIO.add_event_detect(pin, {"falling": GPIO.FALLING, "rising": GPIO.RISING,
+                                        "both": GPIO.BOTH}[edge], callback=self._edge)
+        print(f"[{'Mock' if self.mock else 'Real'} GPIO] Trigger input: pin {pin} "
+              f"({edge} edge, pull {pull}, debounce {debounce * 1000:.0f} ms)")
+
+    def inject(self, pin: int) -> bool:
+        """Simulate an edge (mock input source); False if not an input pin."""
+        if pin not in self.pins:
+            return False
+        self._edge(pin)
+        return True
+
+    def _edge(self, pin: int) -> None:
+        t = time.monotonic()
+        with self._lock:
+            if t - self._last[pin] < self.pins[pin]:
+                return
+            self._last[pin] = t
+        self.callback(pin, t)
+
+    def close(self) -> None:
+        if not self.mock and self.pins:
+            for pin in self.pins:
+                GPIO.remove_event_detect(pin)
+            GPIO.cleanup(list(self.pins))
+        self.pins.clear()
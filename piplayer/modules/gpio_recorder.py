@@ -0,0 +1,108 @@
+# modules/gpio_recorder.py
+"""
+Pin-change recorder for GPIODriver (mock mode or real pins).
+
+Entries go into a preallocated ring buffer in shared memory, so a forked
+sequence worker records and the parent dumps: no list growth, no print,
+no file I/O per event.  When the ring is full the oldest entries are
+overwritten.
+
+Besides (time, pin, state) entries the worker writes markers (pin
+MARK_PIN, state = marker code) with the monotonic time at which the
+current schedule's t=0 lies, so a trace can be lined up with the
+sequence it played (see piplayer-gpiotrace).
+
+Dump file: b"PIGT", <version u16, meta length u32, total u64, kept u64>,
+JSON metadata, then `kept` float64 times, uint16 pins, uint8 states.
+"""
+from __future__ import annotations
+
+import json
+import multiprocessing
+import struct
+import time
+from array import array
+from typing import Callable, Optional
+
+DEFAULT_CAPACITY = 1 << 16       # ≈ 720 kB
+MAGIC            = b"PIGT"
+VERSION          = 1
+_HEADER          = struct.Struct("<HIQQ")
+
+MARK_PIN      = 0xFFFF
+MARK_PLAY     = 1                # t = schedule origin
+MARK_SEEK     = 2                # t = new schedule origin
+MARK_HANDOVER = 3                # queued schedule took over, t = its origin
+MARK_ALL_OFF  = 4                # every prepared pin driven LOW
+MARK_NAMES    = {MARK_PLAY: "play", MARK_SEEK: "seek",
+                 MARK_HANDOVER: "hand-over", MARK_ALL_OFF: "all off"}
+
+
+class GPIORecorder:
+    def __init__(self, capacity: int = DEFAULT_CAPACITY,
+                 clock: Callable[[], float] = time.monotonic):
+        self.capacity = capacity
+        self.clock = clock
+        self._t = multiprocessing.RawArray("d", capacity)
+        self._pin = multiprocessing.RawArray("H", capacity)
+        self._state = multiprocessing.RawArray("B", capacity)
+        self._n = multiprocessing.RawValue("Q", 0)        # total ever recorded
+
+    def record(self, pin: int, state: bool) -> None:
+        n = self._n.value
+        i = n % self.capacity
+        self._t[i] = self.clock()
+        self._pin[i] = pin
+        self._state[i] = state
+        self._n.value = n + 1
+
+    def mark(self, code: int, t: Optional[float] = None) -> None:
+        n = self._n.value
+        i = n % self.capacity
+        self._t[i] = self.clock() if t is None else t
+        self._pin[i] = MARK_PIN
+        self._state[i] = code
+        self._n.value = n + 1
+
+    # ─────────────────────────── reading ───────────────────────────
+    @property
+    def total(self) -> int:
+        return self._n.value
+
+    def entries(self) -> list[tuple[float, int, int]]:
+        """Kept entries, oldest first."""
+        n = self._n.value
+        kept = min(n, self.capacity)
+        start = n - kept
+        cap = self.capacity
+        return [(self._t[j % cap], self._pin[j % cap], self._state[j % cap])
+                for j in range(start, n)]
+
+    def dump(self, path: str, meta: Optional[dict] = None) -> int:
+        """Write the kept entries to `path`; returns how many."""
+        entries = self.entries()
+        blob = json.dumps(meta or {}).encode()
+        with open(path, "wb") as f:
+            f.write(MAGIC)
+            f.write(_HEADER.pack(VERSION, len(blob), self.total, len(entries)))
+            f.write(blob)
+            array("d", (e[0] for e in entries)).tofile(f)
+            array("H", (e[1] for e in entries)).tofile(f)
+            array("B", (e[2] for e in entries)).tofile(f)
+        return len(entries)
+
+
+def load_trace(path: str) -> tuple[dict, list[tuple[float, int, int]], int]:
+    """Read a dump; returns (metadata, entries, total ever recorded)."""
+    with open(path, "rb") as f:
+        if f.read(4) != MAGIC:
+            raise ValueError(f"{path}: not a GPIO trace")
+        version, meta_len, total, kept = _HEADER.unpack(f.read(_HEADER.size))
+        if version != VERSION:
+            raise ValueError(f"{path}: unsupported trace version {version}")
+        meta = json.loads(f.read(meta_len).decode() or "{}")
+        times, pins, states = array("d"), array("H"), array("B")
+        times.fromfile(f, kept)
+        pins.fromfile(f, kept)
+        states.fromfile(f, kept)
+    return meta, list(zip(times, pins, states)), total
@@ -0,0 +1,431 @@
+# modules/pcm_player.py
+"""
+pcm_player.py  –  lightweight wav backend with a sample clock.
+
+The wav file is memory-mapped and written to a sink in fixed-size blocks
+from one thread.  Every block updates a shared SampleClock with the frame
+that is *leaving the speaker* (frames written − frames buffered in the
+sink), so get_time() is the heard position, not a guess.  The clock lives
+in shared memory: a sequence worker forked after construction can use
+``player.get_time`` as its clock and lock to the audio samples.
+
+Sinks
+-----
+• AlsaSink  – sound card via pyalsaaudio (optional dependency)
+• NullSink  – discards samples, paced in real time (no hardware needed)
+• FileSink  – writes a wav file, as fast as possible unless realtime=True
+
+Only PCM wav is read; compressed files go through the PCM cache
+(create_audio_player() turns it on for this backend).
+"""
+from __future__ import annotations
+
+import mmap
+import multiprocessing
+import threading
+import time
+import wave
+from typing import TYPE_CHECKING, Optional
+
+from . import tracing
+from .audio_cache import DEFAULT_SAMPLE_RATE
+from .audio_player import ClockSource, T_AUDIO_SEEK, T_AUDIO_DRIFT
+
+if TYPE_CHECKING:
+    from .audio_cache import AudioCache
+
+# ───────── tweakables ─────────────────────────────
+BLOCK_FRAMES    = 1024    # frames per write (≈21 ms at 48 kHz)
+ALSA_PERIODS    = 4       # sink buffer = BLOCK_FRAMES × ALSA_PERIODS
+SEEK_THRESHOLD  = 0.02    # follower: re-position when drift exceeds this
+SYNC_EVERY      = 8       # follower: check drift every N blocks
+# --------------------------------------------------
+
+
+class SampleClock:
+    """
+    Heard position of a PCMPlayer, shared through fork.
+
+    Seqlock layout: [seq, position_s, stamp_monotonic, running].  The writer
+    bumps seq to odd, writes, bumps it to even; readers retry on a change.
+    """
+
+    def __init__(self):
+        self._v = multiprocessing.RawArray("d", 4)
+
+    def publish(self, position: float, running: bool) -> None:
+        v = self._v
+        v[0] += 1
+        v[1] = position
+        v[2] = time.monotonic()
+        v[3] = 1.0 if running else 0.0
+        v[0] += 1
+
+    def get_time(self) -> float:
+        v = self._v
+        while True:
+            seq = v[0]
+            pos, stamp, running = v[1], v[2], v[3]
+            if seq == v[0] and not int(seq) & 1:
+                break
+        return pos + (time.monotonic() - stamp) if running else pos
+
+
+# ─────────────────────────── sinks ───────────────────────────
+class NullSink:
+    """
+    Discards samples at real-time pace (benchmarks, CI, no sound card).
+    Behaves like a one-block device buffer: a write returns as soon as the
+    previous block has played out.
+    """
+
+    latency_frames = BLOCK_FRAMES
+
+    def open(self, rate: int, channels: int, sampwidth: int) -> None:
+        self.rate = rate
+        self._due = None
+
+    def write(self, data: memoryview, frames: int) -> None:
+        now = time.monotonic()
+        if self._due is None or now - self._due > 0.5:     # (re)start
+            self._due = now
+        delay = self._due - now
+        if delay > 0:
+            time.sleep(delay)
+        self._due += frames / self.rate
+
+    def reset(self) -> None:
+        self._due = None
+
+    def native_rate(self) -> Optional[int]:
+        return None                              # any rate plays as well
+
+    def close(self) -> None:
+        pass
+
+
+class FileSink(NullSink):
+    """Writes what would be played to a wav file."""
+
+    def __init__(self, path: str, realtime: bool = False):
+        self.path = path
+        self.realtime = realtime
+        self._out: Optional[wave.Wave_write] = None
+
+    def open(self, rate: int, channels: int, sampwidth: int) -> None:
+        super().open(rate, channels, sampwidth)
+        if self._out is None:
+            self._out = wave.open(self.path, "wb")
+            self._out.setnchannels(channels)
+            self._out.setsampwidth(sampwidth)
+            self._out.setframerate(rate)
+
+    def write(self, data: memoryview, frames: int) -> None:
+        self._out.writeframesraw(data)
+        if self.realtime:
+            super().write(data, frames)
+
+    def close(self) -> None:
+        if self._out:
+            self._out.close()
+            self._out = None
+
+
+class AlsaSink:
+    """Sound card output through pyalsaaudio; writes block when the buffer is full."""
+
+    def __init__(self, device: str = "default"):
+        self.device = device
+        self.latency_frames = BLOCK_FRAMES * ALSA_PERIODS
+        self._pcm = None
+        self._fmt = None
+        self._native: Optional[int] = None
+        self._asked = False
+
+    def native_rate(self) -> Optional[int]:
+        """
+        The rate the card runs at without resampling, if it has a fixed
+        one (the PCM cache decodes to it); None when it takes any rate.
+        """
+        if not self._asked:
+            self._asked = True
+            rates = None
+            try:
+                import alsaaudio
+                pcm = alsaaudio.PCM(alsaaudio.PCM_PLAYBACK, device=self.device)
+                try:
+                    rates = pcm.getrates()       # pyalsaaudio ≥ 0.9.1
+                finally:
+                    pcm.close()
+            except Exception:                    # no module, busy device, old version
+                pass
+            if isinstance(rates, int):
+                self._native = rates
+            elif isinstance(rates, list) and rates:
+                self._native = DEFAULT_SAMPLE_RATE if DEFAULT_SAMPLE_RATE in rates else max(rates)
+            # a (min, max) tuple is a range: any rate plays natively
+        return self._native
+
+    def open(self, rate: int, channels: int, sampwidth: int) -> None:
+        if self._pcm is not None and self._fmt == (rate, channels, sampwidth):
+            return
+        try:
+            import alsaaudio
+        except ImportError:
+            raise RuntimeError("pcm backend needs pyalsaaudio (pip install pyalsaaudio)")
+        formats = {1: alsaaudio.PCM_FORMAT_U8, 2: alsaaudio.PCM_FORMAT_S16_LE,
+                   3: alsaaudio.PCM_FORMAT_S24_3LE, 4: alsaaudio.PCM_FORMAT_S32_LE}
+        self.close()
+        self._pcm = alsaaudio.PCM(alsaaudio.PCM_PLAYBACK, device=self.device,
+                                  rate=rate, channels=channels,
+                                  format=formats[sampwidth],
+                                  periodsize=BLOCK_FRAMES, periods=ALSA_PERIODS)
+        self._fmt = (rate, channels, sampwidth)
+
+    def write(self, data: memoryview, frames: int) -> None:
+        self._pcm.write(data)
+
+    def reset(self) -> None:
+        pass
+
+    def close(self) -> None:
+        if self._pcm is not None:
+            self._pcm.close()
+            self._pcm = None
+
+
+def make_sink(spec: str):
+    """"alsa[:device]", "null" or "file:out.wav"."""
+    kind, _, arg = spec.partition(":")
+    if kind == "alsa":
+        return AlsaSink(arg or "default")
+    if kind == "null":
+        return NullSink()
+    if kind == "file":
+        return FileSink(arg or "pcm_out.wav")
+    raise ValueError(f"unknown pcm sink: {spec}")
+
+
+# ─────────────────────────── wav source ───────────────────────────
+class _WavSource:
+    def __init__(self, path: str):
+        with wave.open(path, "rb") as w:
+            if w.getcomptype() != "NONE":
+                raise ValueError(f"{path}: not a PCM wav")
+            self.rate = w.getframerate()
+            self.channels = w.getnchannels()
+            self.sampwidth = w.getsampwidth()
+            self.frames = w.getnframes()
+        self.frame_bytes = self.channels * self.sampwidth
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.data_offset = self._find_data()
+        self.view = memoryview(self._map)
+
+    def _find_data(self) -> int:
+        # walk RIFF chunks to the start of "data"
+        pos = 12
+        while pos + 8 <= len(self._map):
+            cid = self._map[pos:pos + 4]
+            size = int.from_bytes(self._map[pos + 4:pos + 8], "little")
+            if cid == b"data":
+                return pos + 8
+            pos += 8 + size + (size & 1)
+        raise ValueError("wav without data chunk")
+
+    def block(self, frame: int, frames: int) -> memoryview:
+        start = self.data_offset + frame * self.frame_bytes
+        return self.view[start:start + frames * self.frame_bytes]
+
+    @property
+    def fmt(self) -> tuple[int, int, int]:
+        return self.rate, self.channels, self.sampwidth
+
+    def close(self) -> None:
+        self.view.release()
+        self._map.close()
+        self._file.close()
+
+
+# ─────────────────────────── player ───────────────────────────
+class PCMPlayer:
+    """Same interface as AudioPlayer (mpv), plus get_time() from the sample clock."""
+
+    def __init__(self, filename: str, latency: Optional[float] = None,
+                 cache: Optional["AudioCache"] = None, sink=None):
+        self.filename = filename
+        self.cache = cache
+        self.sink = sink if sink is not None else AlsaSink()
+        self.clock = SampleClock()
+        self.drift = 0.0
+        # heard position lags what was written by the sink buffer; a configured
+        # latency.audio (passed in here or to load()) overrides that estimate
+        self._configured = latency
+        self.latency = latency if latency is not None else 0.0
+        self._resolved: dict[str, str] = {}
+
+        self._src: Optional[_WavSource] = None
+        self._src_name: Optional[str] = None
+        self._queue: list[str] = []
+        self._frame = 0
+        self._tail: Optional[tuple[int, int]] = None   # (frames, rate) of the file still in the sink
+        self._lock = threading.Lock()
+        self._thr: Optional[threading.Thread] = None
+        self._stop_evt = threading.Event()
+        self._started = threading.Event()
+        self._follower: Optional[ClockSource] = None
+
+    # ───────────────────────────────────────────────
+    def resolve(self, filename: str) -> str:
+        if not self.cache:
+            return filename
+        if filename not in self._resolved:
+            self._resolved[filename] = self.cache.prepare(filename, self.sink.native_rate())
+        return self._resolved[filename]
+
+    def warm_up(self) -> None:
+        """Decode/map the file and open the sink ahead of start()."""
+        if self.filename:
+            self._open(self.filename)
+
+    def _open(self, filename: str) -> None:
+        src = _WavSource(self.resolve(filename))
+        self.sink.open(*src.fmt)
+        if self._configured is None:
+            self.latency = self.sink.latency_frames / src.rate
+        old, self._src, self._src_name = self._src, src, filename
+        if old:
+            old.close()
+
+    def load(self, filename: str, latency: Optional[float] = None) -> None:
+        self.stop()
+        self.filename = filename
+        self._open(filename)
+        if latency is not None:
+            self.latency = latency          # this file only, like AudioPlayer.load
+
+    def queue(self, filename: str) -> None:
+        """Play `filename` right after the current file (same format: gapless)."""
+        self.resolve(filename)
+        with self._lock:
+            self._queue.append(filename)
+
+    def duration(self) -> Optional[float]:
+        return self._src.frames / self._src.rate if self._src else None
+
+    def get_time(self) -> float:
+        """Heard position in seconds (sample clock)."""
+        return self.clock.get_time()
+
+    @property
+    def default_latency(self) -> float:
+        return self.latency
+
+    def latency_for(self, filename: str) -> float:
+        """Latency `filename` will play with, known before it is opened."""
+        if self._configured is not None:
+            return self._configured
+        with wave.open(self.resolve(filename), "rb") as w:
+            return self.sink.latency_frames / w.getframerate()
+
+    # ───────────────────────────────────────────────
+    def start(self, follower: Optional[ClockSource] = None):
+        """Start playback; returns once the first block is in the sink."""
+        self.stop()
+        self._follower = follower
+        if self._src is None or self._src_name != self.filename:
+            self._open(self.filename)
+        self._frame = 0
+        self._tail = None
+        if follower:
+            # what we write now is heard `latency` later
+            target = follower.get_time() + self.latency
+            self._frame = int(max(0.0, target) * self._src.rate)
+        self.sink.reset()
+        self._stop_evt.clear()
+        self._started.clear()
+        self._thr = threading.Thread(target=self._stream, daemon=True)
+        self._thr.start()
+        self._started.wait(timeout=2.0)
+
+    def _stream(self):
+        blocks = 0
+        while not self._stop_evt.is_set():
+            with self._lock:
+                src, frame, tail = self._src, self._frame, self._tail
+                n = min(BLOCK_FRAMES, src.frames - frame)
+                if n <= 0:
+                    if not self._queue:
+                        break
+                    self._next_file()
+                    continue
+                self._frame = frame + n
+
+            try:
+                self.sink.write(src.block(frame, n), n)
+            except Exception as e:
+                print("[PCM] sink error:", e)
+                break
+            blocks += 1
+            heard = frame + n - self.sink.latency_frames
+            if heard < 0 and tail:
+                # the previous file's last frames are still in the sink
+                self.clock.publish(max(tail[0] + heard, 0) / tail[1], True)
+            else:
+                self.clock.publish(max(heard, 0) / src.rate, True)
+            self._started.set()
+
+            if self._follower and blocks % SYNC_EVERY == 0:
+                self._sync()
+
+        self.clock.publish(self.clock.get_time(), False)
+        self._started.set()
+
+    def _next_file(self) -> None:
+        # called with the lock held: gapless hand-over to the queued file
+        name = self._queue.pop(0)
+        src = _WavSource(self.resolve(name))
+        if src.fmt != self._src.fmt:
+            self.sink.open(*src.fmt)        # format change: unavoidable reopen
+            self._tail = None               # ... which drops what was buffered
+        else:
+            self._tail = (self._src.frames, self._src.rate)
+        # the old map is dropped, not closed: the stream thread may still hold a block
+        self._src = src
+        self.filename = self._src_name = name
+        self._frame = 0
+
+    def _sync(self) -> None:
+        try:
+            master = self._follower.get_time()
+        except RuntimeError:
+            return
+        self.drift = self.get_time() - master
+        tracing.counter(T_AUDIO_DRIFT, self.drift * 1000)
+        if abs(self.drift) > SEEK_THRESHOLD:
+            # sample-accurate: no decode buffer to refill, no settle time
+            self.seek(master + self.latency)
+
+    def seek(self, position: float) -> None:
+        tracing.instant(T_AUDIO_SEEK, position)
+        with self._lock:
+            self._tail = None
+            if self._src:
+                self._frame = min(int(max(0.0, position) * self._src.rate), self._src.frames)
+
+    # ───────────────────────────────────────────────
+    def stop(self):
+        if self._thr:
+            self._stop_evt.set()
+            self._thr.join()
+            self._thr = None
+        with self._lock:
+            self._queue.clear()
+
+    def wait_done(self):
+        if self._thr:
+            self._thr.join()
+            self._thr = None
+
+    def is_playing(self):
+        return self._thr is not None and self._thr.is_alive()
@@ -0,0 +1,178 @@
+# modules/sequence_layers.py
+"""
+Several MIDI files played as one sequence (`piplayer -s base.mid -s fx.mid@12`).
+
+Each `-s` is a layer spec:
+
+    FILE[@OFFSET][:ROUTE]
+
+    base.mid                  as is
+    fx.mid@12.5               starts 12.5 s into the show
+    intro.mid@-4              first 4 s of the file skipped
+    strobe.mid:60=17,61=18    note 60 → pin 17, note 61 → pin 18
+    chase.mid@8:+5            every note 5 pins up
+
+Every layer is parsed and compiled on its own (the config applies to its
+track names as usual), then the already-sorted schedules are combined
+with a k-way merge, so one worker fires all layers from one timeline.
+Layers driving the same pin share its level: any layer's note-off turns
+it off.  A route that sends a note of the file outside 0..127 is an
+error, raised before anything plays.
+"""
+from __future__ import annotations
+
+import heapq
+import os
+import re
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Iterable, Iterator, List, Union
+
+from .sequence_loader import MidiEvent, SequenceLoader, compile_events
+
+_SPEC = re.compile(r"^(?P<path>.+?)(?:@(?P<offset>[-+]?\d*\.?\d+))?(?::(?P<route>[-+\d=,\s]+))?$")
+_TIME = lambda e: e.time_s
+
+
+@dataclass
+class Layer:
+    path: str
+    offset: float = 0.0                               # seconds, negative = skip into the file
+    transpose: int = 0                                # added to notes not in `pins`
+    pins: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def routed(self) -> bool:
+        return bool(self.transpose or self.pins)
+
+    def spec(self) -> str:
+        """Inverse of parse_layer(), with an absolute path."""
+        out = os.path.abspath(self.path)
+        if self.offset:
+            out += f"@{self.offset:g}"
+        route = [f"{n}={p}" for n, p in sorted(self.pins.items())]
+        if self.transpose:
+            route.append(f"{self.transpose:+d}")
+        if route:
+            out += ":" + ",".join(route)
+        return out
+
+    def route(self, note: int) -> int:
+        return self.pins.get(note, note + self.transpose)
+
+
+def parse_layer(spec: str) -> Layer:
+    if os.path.exists(spec):                          # odd file names win over the syntax
+        return Layer(spec)
+    m = _SPEC.match(spec.strip())
+    if not m:
+        raise ValueError(f"bad sequence layer {spec!r}")
+    layer = Layer(m["path"], float(m["offset"] or 0.0))
+    for part in filter(None, (p.strip() for p in (m["route"] or "").split(","))):
+        if "=" in part:
+            note, pin = part.split("=", 1)
+            layer.pins[int(note)] = int(pin)
+        else:
+            layer.transpose += int(part)
+    for note, pin in layer.pins.items():
+        if not (0 <= note <= 127 and 0 <= pin <= 127):
+            raise ValueError(f"bad routing in sequence layer {spec!r}: "
+                             f"{note}={pin} is outside 0..127")
+    if not -127 <= layer.transpose <= 127:
+        raise ValueError(f"bad routing in sequence layer {spec!r}: "
+                         f"{layer.transpose:+d} moves every note outside 0..127")
+    return layer
+
+
+def check_routing(layer: Layer, notes: Iterable[int]) -> None:
+    """Raise ValueError if the layer routes any of `notes` outside 0..127."""
+    if not layer.routed:
+        return
+    bad = sorted(n for n in set(notes) if not 0 <= layer.route(n) <= 127)
+    if bad:
+        raise ValueError(f"sequence layer {layer.spec()!r} routes note {bad[0]} to "
+                         f"{layer.route(bad[0])}, outside 0..127 ({len(bad)} notes in all)")
+
+
+def _placed(layer: Layer, events: Iterable[MidiEvent]) -> Iterator[MidiEvent]:
+    """A layer's events with its offset and routing applied (order kept)."""
+    for ev in events:
+        t = ev.time_s + layer.offset
+        if t < 0.0:
+            continue
+        msg = ev.msg
+        if layer.routed:
+            msg = msg.copy(note=layer.route(msg.note))     # in range: check_routing()
+        yield MidiEvent(t, ev.track, msg)
+
+
+class LayeredSequence:
+    """SequenceLoader stand-in for several layers."""
+
+    def __init__(self, layers: List[Layer]):
+        self.layers = layers
+        self.midi_path = layers[0].path if layers else None
+        self.track_names: List[str] = []
+        self._events: List[List[MidiEvent]] = []          # per layer, routed, sorted
+        for layer in layers:
+            seq = SequenceLoader(layer.path)
+            check_routing(layer, (ev.msg.note for ev in seq.events))
+            self.track_names += [t for t in seq.track_names if t not in self.track_names]
+            self._events.append(list(_placed(layer, seq.events)))
+        self.events: List[MidiEvent] = list(heapq.merge(*self._events, key=_TIME))
+
+    def compile(self, offset_for: Callable[[str], float]) -> List[MidiEvent]:
+        """Per-layer SequenceLoader.compile(), then one k-way merge."""
+        return list(heapq.merge(*(compile_events(evs, offset_for) for evs in self._events),
+                                key=_TIME))
+
+    debug_print = SequenceLoader.debug_print
+
+
+def load_sequence(specs: Union[str, List[str]]) -> Union[SequenceLoader, LayeredSequence]:
+    """One plain file → SequenceLoader; anything else → LayeredSequence."""
+    if isinstance(specs, str):
+        specs = [specs]
+    layers = [parse_layer(s) for s in specs]
+    if len(layers) == 1 and not layers[0].offset and not layers[0].routed:
+        return SequenceLoader(layers[0].path)
+    return LayeredSequence(layers)
+
+
+def stream_sequence(specs: Union[str, List[str]]) -> Iterator[MidiEvent]:
+    """
+    load_sequence(specs).events, parsed lazily (see sequence_stream.py).
+    Call stream_scan() first: it is where the routing is checked.
+    """
+    from .sequence_stream import read_events
+    if isinstance(specs, str):
+        specs = [specs]
+    return heapq.merge(*(_placed(layer, read_events(layer.path))
+                         for layer in map(parse_layer, specs)), key=_TIME)
+
+
+def stream_scan(specs: Union[str, List[str]]) -> tuple[float, set]:
+    """
+    (end of the show, pins it drives) for streaming, from one quick pass
+    per layer before anything plays: the worker prepares every pin up
+    front, and routes are checked here.
+    """
+    from .sequence_stream import scan
+    if isinstance(specs, str):
+        specs = [specs]
+    length, pins = 0.0, set()
+    for layer in map(parse_layer, specs):
+        end, notes = scan(layer.path)
+        check_routing(layer, notes)
+        length = max(length, end + layer.offset)
+        pins |= {layer.route(n) for n in notes}
+    return length, pins
+
+
+def sequence_ref(specs: Union[str, List[str], None]) -> Union[str, List[str], None]:
+    """What status snapshots and GPIO traces store: absolute path(s)/spec(s)."""
+    if not specs:
+        return None
+    if isinstance(specs, str):
+        specs = [specs]
+    refs = [parse_layer(s).spec() for s in specs]
+    return refs[0] if len(refs) == 1 else refs
@@ -1,8 +1,10 @@
 # modules/sequence_loader.py
 from __future__ import annotations
 from dataclasses import dataclass
-from typing import List
-from mido import MidiFile, Message, MetaMessage
+from typing import TYPE_CHECKING, Callable, Dict, List
+
+if TYPE_CHECKING:
+    from mido import Message, MetaMessage
 
 
 @dataclass
@@ -27,6 +29,7 @@ class SequenceLoader:
 
     # -----------------------------------------------------------------
     def _load(self) -> None:
+        from mido import MidiFile       # deferred: only needed when parsing
         mid = MidiFile(self.midi_path)
         ticks_per_beat = mid.ticks_per_beat
         default_tempo = 500_000          # 120 BPM
@@ -34,6 +37,7 @@ class SequenceLoader:
         # Each track keeps its own running “ticks” counter
         abs_ticks = [0] * len(mid.tracks)
         current_tempo = default_tempo
+        tempo_tick, tempo_secs = 0, 0.0  # where the current tempo took over
 
         # Keep a name for every track (may be overwritten by “track_name”)
         for i, trk in enumerate(mid.tracks):
@@ -54,17 +58,20 @@ class SequenceLoader:
             msg = pointers[next_track]
             abs_ticks[next_track] += msg.time
 
+            # Convert *that* track’s current absolute tick value → seconds
+            # (ticks since the last tempo change at the current tempo)
+            secs = tempo_secs + ((abs_ticks[next_track] - tempo_tick) / ticks_per_beat) \
+                * (current_tempo / 1_000_000)
+
             # Tempo changes are global (apply to ALL following tracks)
             if msg.type == "set_tempo":
+                tempo_tick, tempo_secs = abs_ticks[next_track], secs
                 current_tempo = msg.tempo
 
             # Track name (cosmetic)
             if msg.type == "track_name":
                 self.track_names[next_track] = msg.name.strip()
 
-            # Convert *that* track’s current absolute tick value → seconds
-            secs = (abs_ticks[next_track] / ticks_per_beat) * (current_tempo / 1_000_000)
-
             # Store musical events
             if msg.type in ("note_on", "note_off"):
                 self.events.append(
@@ -77,6 +84,15 @@ class SequenceLoader:
         # Finally sort (safety) so events are strictly chronological
         self.events.sort(key=lambda e: e.time_s)
 
+    # -----------------------------------------------------------------
+    def compile(self, offset_for: Callable[[str], float]) -> List[MidiEvent]:
+        """
+        Return the playback schedule: every event shifted by
+        ``offset_for(track)`` seconds (negative = earlier) and re-sorted once.
+        Events shifted before zero fire right at the start.
+        """
+        return compile_events(self.events, offset_for)
+
     # -----------------------------------------------------------------
     def debug_print(self) -> None:
         print(f"\nMIDI DEBUG: {len(self.events)} note events\n" + "-" * 40)
@@ -88,3 +104,18 @@ class SequenceLoader:
                 print(f"{ev.time_s:7.3f}s  {ev.track:<10} note-off "
                       f"note={ev.msg.note}")
         print("-" * 40 + "\n")
+
+
+def compile_events(events: List[MidiEvent],
+                   offset_for: Callable[[str], float]) -> List[MidiEvent]:
+    """SequenceLoader.compile() for any event list."""
+    offsets: Dict[str, float] = {}
+    schedule = []
+    for ev in events:
+        if ev.track not in offsets:
+            offsets[ev.track] = offset_for(ev.track)
+        schedule.append(
+            MidiEvent(max(0.0, ev.time_s + offsets[ev.track]), ev.track, ev.msg)
+        )
+    schedule.sort(key=lambda e: e.time_s)
+    return schedule
@@ -1,31 +1,304 @@
 # modules/sequence_process.py
+import bisect
+import multiprocessing
+import threading
 import time
-from .gpio_driver import GPIODriver
+from typing import Callable, Iterable, Optional
+from .gpio_driver import GPIODriver, gpio_available
+from .gpio_recorder import MARK_PLAY, MARK_SEEK, MARK_HANDOVER
 from .sequence_loader import MidiEvent
+from .status import SequenceStatus
+from . import tracing
+
+POLL_MARGIN_S = 0.002     # stop waiting on the pipe this long before an event
+JOIN_LATE_S   = 0.05      # play behind by more: skip past events (follower joining mid-show)
+
+_T_FIRE = tracing.register("worker.fire", "worker", arg="late_ms")
+_T_WAIT = tracing.register("worker.wait", "worker")
+_T_CMD  = tracing.register("worker.cmd", "worker")
+
+
+def _fire(ev: MidiEvent, gpio: Optional[GPIODriver]) -> Optional[bool]:
+    """Fire one event; returns the new pin state (None if not a note event)."""
+    if ev.msg.type == "note_on":
+        if gpio:
+            gpio.note_on(ev.msg.note, ev.msg.velocity)
+        return ev.msg.velocity > 0
+    if ev.msg.type == "note_off":
+        if gpio:
+            gpio.note_off(ev.msg.note)
+        return False
+    return None
+
+
+def _pins(events: list[MidiEvent]) -> set[int]:
+    return {ev.msg.note for ev in events if ev.msg.type == "note_on"}
+
+
+def _levels(events: list[MidiEvent]) -> dict[int, bool]:
+    """Pin levels the events leave behind (pins they don't touch are absent)."""
+    levels: dict[int, bool] = {}
+    for ev in events:
+        if ev.msg.type == "note_on":
+            levels[ev.msg.note] = ev.msg.velocity > 0
+        elif ev.msg.type == "note_off":
+            levels[ev.msg.note] = False
+    return levels
+
+
+def _origin(clock: Callable[[], float], cycle_start: float) -> float:
+    """`cycle_start` on `clock` expressed as a time.monotonic() value (for traces)."""
+    return time.monotonic() - (clock() - cycle_start)
 
 
 class SequenceProcess:
     """Standalone worker process that triggers events by system clock."""
 
     @staticmethod
-    def run(events: list[MidiEvent], cycle_start: float) -> None:
+    def run(events: list[MidiEvent], cycle_start: float,
+            clock: Callable[[], float] = time.monotonic,
+            status: Optional[SequenceStatus] = None,
+            gpio_factory: Callable[[list[int]], GPIODriver] = GPIODriver) -> None:
+        """
+        Fire the (already latency-compiled) events at ``cycle_start + time_s``
+        as measured by ``clock``.  If ``status`` is given, pin levels and
+        lateness are written to it for the status publisher.
+        ``gpio_factory`` builds the output driver (benchmarks pass a recorder).
+        """
         # ────────── prepare GPIO ──────────
-        pins_needed = {ev.msg.note for ev in events if ev.msg.type == "note_on"}
-        gpio = GPIODriver(sorted(pins_needed)) if pins_needed else None
+        pins_needed = _pins(events)
+        gpio = gpio_factory(sorted(pins_needed)) if pins_needed else None
+        if status:
+            status.reset()
+        if gpio:
+            gpio.mark(MARK_PLAY, _origin(clock, cycle_start))
+        trace = tracing.enabled()
 
         # ────────── main loop ──────────
         for ev in events:
             target = cycle_start + ev.time_s
 
             # Sleep exactly the remaining time (no busy-loop, no extra break)
-            delay = target - time.monotonic()
+            delay = target - clock()
             if delay > 0:
                 time.sleep(delay)
 
             # Fire the event
-            if ev.msg.type == "note_on":
-                if gpio:
-                    gpio.note_on(ev.msg.note, ev.msg.velocity)
-            elif ev.msg.type == "note_off":
-                if gpio:
-                    gpio.note_off(ev.msg.note)
+            on = _fire(ev, gpio)
+            if status and on is not None:
+                status.record(ev.msg.note, on, clock() - target)
+            if trace:
+                tracing.instant(_T_FIRE, (clock() - target) * 1000)
+
+
+class SequenceWorker:
+    """
+    Long-lived sequence process.
+
+    GPIO stays set up between shows and compiled schedules are loaded into
+    the worker ahead of time, so play/stop/seek only send a short command
+    over the pipe.  Waiting for the next event is done with ``poll(timeout)``
+    on that pipe, so commands interrupt the wait immediately.  A schedule can
+    also be queued to take over at an exact time (gapless hand-over).
+
+    Create it (and its ``status``) before starting anything that should not
+    be forked, e.g. the mpv instance.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic,
+                 status: Optional[SequenceStatus] = None,
+                 gpio_factory: Callable[[list[int]], GPIODriver] = GPIODriver):
+        self._conn, child = multiprocessing.Pipe()
+        self._send_lock = threading.Lock()       # prefetch threads send too
+        self.proc = multiprocessing.Process(
+            target=SequenceWorker._serve, args=(child, clock, status, gpio_factory),
+            daemon=True,
+        )
+
+    def start(self) -> None:
+        gpio_available()        # probe once here so the worker inherits the result
+        self.proc.start()
+
+    def _send(self, cmd: tuple) -> None:
+        with self._send_lock:
+            self._conn.send(cmd)
+
+    def load(self, name: str, events: list[MidiEvent], pins: Iterable[int] = ()) -> None:
+        """
+        Store a compiled schedule in the worker and prepare its pins, plus
+        `pins` (a streamed schedule's later events).
+        """
+        self._send(("load", name, events, set(pins)))
+
+    def append(self, name: str, events: list[MidiEvent]) -> None:
+        """
+        Extend a loaded schedule (streaming); its fired events are dropped.
+        No GPIO set-up happens here: load() prepares the pins.
+        """
+        self._send(("append", name, events))
+
+    def play(self, name: str, cycle_start: float, edge: float = 0.0) -> None:
+        """
+        Fire schedule `name` relative to `cycle_start` (worker clock).  With
+        an input `edge` time, the worker reports edge → first event through
+        SequenceStatus.record_trigger().
+        """
+        self._send(("play", name, cycle_start, edge))
+
+    def queue(self, name: str, cycle_start: float) -> None:
+        """Hand over to schedule `name` at `cycle_start`, dropping what is left."""
+        self._send(("queue", name, cycle_start))
+
+    def seek(self, cycle_start: float) -> None:
+        """Move the current schedule to a new start time, restoring pin levels."""
+        self._send(("seek", cycle_start))
+
+    def stop(self) -> None:
+        """Stop firing and switch all outputs off."""
+        self._send(("stop",))
+
+    def close(self) -> None:
+        if self.proc.is_alive():
+            self._send(("quit",))
+            self.proc.join(timeout=2.0)
+        if self.proc.is_alive():
+            self.proc.terminate()
+            self.proc.join()
+
+    # ─────────────────────── worker side ───────────────────────
+    @staticmethod
+    def _serve(conn, clock: Callable[[], float],
+               status: Optional[SequenceStatus],
+               gpio_factory: Callable[[list[int]], GPIODriver]) -> None:
+        gpio = gpio_factory([])
+        tracing.set_process_name("sequence worker")
+        trace = tracing.enabled()
+        schedules: dict[str, tuple[list[MidiEvent], list[float]]] = {}
+        events: list[MidiEvent] = []
+        times: list[float] = []
+        idx = 0
+        cycle_start = 0.0
+        pending: Optional[tuple[str, float]] = None      # queued (name, start)
+        edge = 0.0                                       # of the triggered play, until it fires
+
+        def apply(levels: dict[int, bool], pins) -> None:
+            for pin in pins:
+                gpio.set(pin, levels.get(pin, False))
+                if status:
+                    status.pins[pin] = levels.get(pin, False)
+
+        def restore(upto: int) -> None:
+            # pin levels as they would be after events[:upto]
+            apply(_levels(events[:upto]), gpio.pins)
+
+        def join() -> None:
+            # start at the playhead like a seek, instead of firing the past at once
+            nonlocal idx
+            upto = bisect.bisect_left(times, clock() - cycle_start - JOIN_LATE_S, idx)
+            if upto > idx:
+                levels = _levels(events[idx:upto])
+                apply(levels, levels)           # streamed: earlier events are gone
+                idx = upto
+
+        try:
+            while True:
+                timeout = None
+                if idx < len(events):
+                    timeout = cycle_start + events[idx].time_s
+                if pending and (timeout is None or pending[1] <= timeout):
+                    timeout = pending[1]
+                if timeout is not None:
+                    timeout = max(timeout - clock(), 0.0)
+
+                ready = False
+                if timeout is None or timeout > POLL_MARGIN_S:
+                    # long wait: on the pipe, so commands interrupt it
+                    t0 = tracing.now() if trace else 0.0
+                    ready = conn.poll(None if timeout is None else timeout - POLL_MARGIN_S)
+                    if trace:
+                        tracing.complete(_T_WAIT, t0)
+                    if not ready:
+                        continue                    # now within the margin
+                elif timeout > 0.0:
+                    # last stretch: poll() only has ms resolution, sleep is finer
+                    t0 = tracing.now() if trace else 0.0
+                    time.sleep(timeout)
+                    if trace:
+                        tracing.complete(_T_WAIT, t0)
+
+                if ready:
+                    cmd = conn.recv()
+                    op = cmd[0]
+                    if trace:
+                        tracing.instant(_T_CMD)
+                    if op == "load":
+                        _, name, evs, pins = cmd
+                        schedules[name] = (evs, [ev.time_s for ev in evs])
+                        gpio.add_pins(_pins(evs) | pins)
+                    elif op == "append":
+                        _, name, evs = cmd
+                        if name not in schedules:
+                            continue
+                        sched_events, sched_times = schedules[name]
+                        if sched_events is events and idx:
+                            del events[:idx]            # streamed: keep only the window
+                            del times[:idx]
+                            idx = 0
+                        sched_events.extend(evs)
+                        sched_times.extend(ev.time_s for ev in evs)
+                        if sched_events is events:
+                            join()
+                    elif op == "play":
+                        _, name, cycle_start, edge = cmd
+                        gpio.mark(MARK_PLAY, _origin(clock, cycle_start))
+                        gpio.all_off()
+                        events, times = schedules.get(name, ([], []))
+                        idx = 0
+                        pending = None
+                        if status:
+                            status.reset()
+                            status.first_fire[0] = 0.0  # from this schedule only
+                        join()
+                    elif op == "queue":
+                        pending = (cmd[1], cmd[2])
+                    elif op == "seek":
+                        cycle_start = cmd[1]
+                        gpio.mark(MARK_SEEK, _origin(clock, cycle_start))
+                        idx = bisect.bisect_left(times, clock() - cycle_start)
+                        restore(idx)
+                    elif op == "stop":
+                        events, times, idx = [], [], 0
+                        edge = 0.0
+                        pending = None
+                        gpio.all_off()
+                    elif op == "quit":
+                        break
+                    continue
+
+                # hand over to the queued schedule (pin levels carry over)
+                if pending and (idx >= len(events)
+                                or pending[1] <= cycle_start + events[idx].time_s):
+                    name, cycle_start = pending
+                    gpio.mark(MARK_HANDOVER, _origin(clock, cycle_start))
+                    events, times = schedules.get(name, ([], []))
+                    idx = 0
+                    pending = None
+                    continue
+
+                # fire everything that is due
+                ev = events[idx]
+                target = cycle_start + ev.time_s
+                on = _fire(ev, gpio)
+                if status and on is not None:
+                    status.record(ev.msg.note, on, clock() - target)
+                    if edge:
+                        status.record_trigger(edge, clock() - edge - ev.time_s)
+                        edge = 0.0
+                if trace:
+                    tracing.instant(_T_FIRE, (clock() - target) * 1000)
+                idx += 1
+        except (EOFError, KeyboardInterrupt):
+            pass
+        finally:
+            gpio.all_off()
+            gpio.cleanup()
@@ -0,0 +1,273 @@
+# modules/sequence_stream.py
+"""
+Streaming sequence load (`piplayer -s show.mid --stream`).
+
+read_events() walks a Standard MIDI File straight from a memory map and
+yields note events in time order as it goes: one small cursor per track,
+merged on a heap by absolute tick, with the tempo map integrated on the
+way (same timing as SequenceLoader).  compile_stream() applies the
+per-track latency shifts with a reorder heap that only ever holds events
+closer together than the spread of those shifts.  SequenceFeeder hands
+the result to the worker LOOKAHEAD_S ahead of the playhead.
+
+Playback starts as soon as the first LOOKAHEAD_S are parsed, and memory is
+bounded by the lookahead window instead of the whole file.  The worker
+forgets streamed events once they have fired, so a streamed schedule can't
+be sought backwards; every loop streams the file again.
+"""
+from __future__ import annotations
+
+import heapq
+import mmap
+import struct
+import threading
+from typing import TYPE_CHECKING, Callable, Iterable, Iterator, List, Optional
+
+from .sequence_loader import MidiEvent
+
+if TYPE_CHECKING:
+    from .sequence_process import SequenceWorker
+
+LOOKAHEAD_S   = 2.0        # how far ahead of the playhead the worker is fed
+CHUNK         = 512        # max events per pipe message
+DEFAULT_TEMPO = 500_000    # µs per beat (120 BPM)
+
+_NOTE_OFF, _NOTE_ON, _TEMPO, _NAME = 0x80, 0x90, 0x100, 0x101
+_DATA_BYTES = {0x80: 2, 0x90: 2, 0xA0: 2, 0xB0: 2, 0xC0: 1, 0xD0: 1, 0xE0: 2}
+
+
+# ─────────────────────────── SMF parsing ───────────────────────────
+def _vlq(data, i: int) -> tuple[int, int]:
+    value = 0
+    while True:
+        b = data[i]
+        i += 1
+        value = (value << 7) | (b & 0x7F)
+        if b < 0x80:
+            return value, i
+
+
+def _track(data, i: int, end: int) -> Iterator[tuple]:
+    """(abs tick, kind, …) for the events of one MTrk chunk we care about."""
+    tick = status = 0
+    while i < end:
+        delta, i = _vlq(data, i)
+        tick += delta
+        b = data[i]
+        if b == 0xFF:                                   # meta
+            kind = data[i + 1]
+            length, i = _vlq(data, i + 2)
+            if kind == 0x51 and length == 3:
+                yield tick, _TEMPO, int.from_bytes(data[i:i + 3], "big")
+            elif kind == 0x03:
+                yield tick, _NAME, bytes(data[i:i + length]).decode("latin-1")
+            elif kind == 0x2F:
+                return
+            i += length
+        elif b in (0xF0, 0xF7):                         # sysex
+            length, i = _vlq(data, i + 1)
+            i += length
+        else:
+            if b & 0x80:
+                status = b
+                i += 1                                  # else: running status
+            kind = status & 0xF0
+            if kind not in _DATA_BYTES:
+                raise ValueError(f"bad MIDI data at byte {i}")
+            if kind in (_NOTE_OFF, _NOTE_ON):
+                yield tick, kind, status & 0x0F, data[i], data[i + 1]
+            i += _DATA_BYTES[kind]
+
+
+def _tracks(data, path: str) -> tuple[list, int]:
+    """(one _track() cursor per MTrk chunk, ticks per beat)."""
+    if data[:4] != b"MThd":
+        raise ValueError(f"{path}: not a MIDI file")
+    header_len = int.from_bytes(data[4:8], "big")
+    _, n_tracks, ticks_per_beat = struct.unpack(">HHH", data[8:14])
+    if ticks_per_beat & 0x8000:
+        raise ValueError(f"{path}: SMPTE time division is not supported")
+
+    tracks = []
+    pos = 8 + header_len
+    while pos + 8 <= len(data) and len(tracks) < n_tracks:
+        length = int.from_bytes(data[pos + 4:pos + 8], "big")
+        if data[pos:pos + 4] == b"MTrk":
+            tracks.append(_track(data, pos + 8, min(pos + 8 + length, len(data))))
+        pos += 8 + length
+    return tracks, ticks_per_beat
+
+
+def read_events(path: str) -> Iterator[MidiEvent]:
+    """Note events of a MIDI file, in time order, parsed as they are consumed."""
+    from mido import Message            # deferred, like SequenceLoader
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        tracks, ticks_per_beat = _tracks(data, path)
+        names = [f"Track-{i}" for i in range(len(tracks))]
+
+        # (tick, track, item): ties go to the lower track, like SequenceLoader
+        heap = []
+        for ti, trk in enumerate(tracks):
+            item = next(trk, None)
+            if item:
+                heap.append((item[0], ti, item))
+        heapq.heapify(heap)
+
+        tempo, tempo_tick, tempo_s = DEFAULT_TEMPO, 0, 0.0
+        while heap:
+            tick, ti, item = heap[0]
+            following = next(tracks[ti], None)
+            if following is None:
+                heapq.heappop(heap)
+            else:
+                heapq.heapreplace(heap, (following[0], ti, following))
+
+            # same arithmetic as SequenceLoader, so both give identical times
+            secs = tempo_s + ((tick - tempo_tick) / ticks_per_beat) * (tempo / 1_000_000)
+            kind = item[1]
+            if kind == _TEMPO:
+                tempo, tempo_tick, tempo_s = item[2], tick, secs
+            elif kind == _NAME:
+                names[ti] = item[2].strip()
+            else:
+                _, _, channel, note, velocity = item
+                yield MidiEvent(secs, names[ti],
+                                Message("note_on" if kind == _NOTE_ON else "note_off",
+                                        channel=channel, note=note, velocity=velocity))
+    finally:
+        data.close()
+
+
+def scan(path: str) -> tuple[float, set]:
+    """
+    (time of the last note event, note numbers used) of a MIDI file: the
+    show length read_events() ends on, without merging tracks or building
+    messages.
+    """
+    with open(path, "rb") as f:
+        data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    try:
+        tracks, ticks_per_beat = _tracks(data, path)
+        tempos, last, notes = [], 0, set()
+        for trk in tracks:
+            for item in trk:
+                if item[1] == _TEMPO:
+                    tempos.append((item[0], item[2]))
+                elif item[1] != _NAME:
+                    last = max(last, item[0])
+                    notes.add(item[3])
+    finally:
+        data.close()
+
+    tempo, tempo_tick, tempo_s = DEFAULT_TEMPO, 0, 0.0
+    for tick, value in sorted(tempos, key=lambda t: t[0]):
+        if tick > last:
+            break
+        tempo_s += ((tick - tempo_tick) / ticks_per_beat) * (tempo / 1_000_000)
+        tempo, tempo_tick = value, tick
+    return tempo_s + ((last - tempo_tick) / ticks_per_beat) * (tempo / 1_000_000), notes
+
+
+def compile_stream(events: Iterator[MidiEvent], offset_for: Callable[[str], float],
+                   min_offset: float) -> Iterator[MidiEvent]:
+    """
+    SequenceLoader.compile() for a time-ordered stream.  ``min_offset`` is
+    the lowest value ``offset_for`` can return (PlayerConfig.min_offset());
+    events wait in a heap until nothing later in the stream can land
+    before them.  Same order as the batch compile, ties included.
+    """
+    offsets: dict = {}
+    heap: list = []
+    seq = 0
+    for ev in events:
+        offset = offsets.get(ev.track)
+        if offset is None:
+            offset = offsets[ev.track] = offset_for(ev.track)
+            min_offset = min(min_offset, offset)
+        heapq.heappush(heap, (max(0.0, ev.time_s + offset), seq, ev.track, ev.msg))
+        seq += 1
+        safe = max(0.0, ev.time_s + min_offset)
+        while heap and heap[0][0] <= safe:
+            t, _, track, msg = heapq.heappop(heap)
+            yield MidiEvent(t, track, msg)
+    while heap:
+        t, _, track, msg = heapq.heappop(heap)
+        yield MidiEvent(t, track, msg)
+
+
+# ─────────────────────────── feeding the worker ───────────────────────────
+class SequenceFeeder:
+    """
+    Feeds a compiled stream to a SequenceWorker, LOOKAHEAD_S ahead.
+
+    The first window is parsed on construction; preload() hands it to the
+    worker ahead of time and begin() starts playback and continues from a
+    thread.
+    """
+
+    def __init__(self, schedule: Iterator[MidiEvent], lookahead: float = LOOKAHEAD_S):
+        self.lookahead = lookahead
+        self.last_time = 0.0                 # of the latest event handed over
+        self.sent = 0
+        self.done = False                    # whole stream handed to the worker
+        self.started = False
+        self._it = schedule
+        self._next: Optional[MidiEvent] = next(self._it, None)
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._worker: Optional[SequenceWorker] = None
+        self.name = ""                       # schedule name in the worker
+        self._first = self._take(lookahead, limit=None)
+
+    def _take(self, horizon: float, limit: Optional[int] = CHUNK) -> List[MidiEvent]:
+        out = []
+        while self._next is not None and self._next.time_s <= horizon:
+            out.append(self._next)
+            self._next = next(self._it, None)
+            if limit and len(out) >= limit:
+                break
+        if out:
+            self.last_time = out[-1].time_s
+            self.sent += len(out)
+        if self._next is None:
+            self.done = True
+        return out
+
+    def preload(self, worker: SequenceWorker, name: str, pins: Iterable[int] = ()) -> None:
+        """
+        Load the first window into the worker (before anything plays), with
+        every pin the stream will drive (see stream_scan()).
+        """
+        self._worker, self.name = worker, name
+        worker.load(name, self._first, pins)
+        self._first = []
+
+    def begin(self, clock: Callable[[], float], cycle_start: float) -> None:
+        self.started = True
+        self._worker.play(self.name, cycle_start)
+        if not self.done:
+            self._thread = threading.Thread(target=self._run, args=(clock, cycle_start),
+                                            daemon=True)
+            self._thread.start()
+
+    def _run(self, clock: Callable[[], float], cycle_start: float) -> None:
+        while not self._stop.is_set() and not self.done:
+            try:
+                horizon = clock() - cycle_start + self.lookahead
+            except RuntimeError:                 # follower without sync for a moment
+                self._stop.wait(self.lookahead / 4)
+                continue
+            chunk = self._take(horizon)
+            if chunk:
+                self._worker.append(self.name, chunk)
+                if len(chunk) == CHUNK:
+                    continue                     # more is due already
+            self._stop.wait(self.lookahead / 4)
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread:
+            self._thread.join()
+            self._thread = None
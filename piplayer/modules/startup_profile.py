@@ -0,0 +1,80 @@
+# modules/startup_profile.py
+"""
+Phase-by-phase timing of a cold start, up to the first fired event
+(`piplayer --profile-startup`).
+
+Sequential phases are closed with mark(); work that runs in a background
+thread is timed with parallel() and listed separately.  When disabled every
+call is a no-op.
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+
+def process_age() -> Optional[float]:
+    """Seconds since this process was exec'd (Linux only), else None."""
+    try:
+        with open("/proc/self/stat") as f:
+            fields = f.read().rsplit(")", 1)[1].split()
+        start_ticks = int(fields[19])          # field 22: starttime
+        started = start_ticks / os.sysconf("SC_CLK_TCK")
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - started
+    except (OSError, ValueError, IndexError, AttributeError):
+        return None
+
+
+class StartupProfile:
+    def __init__(self, enabled: bool = False, t0: Optional[float] = None):
+        self.enabled = enabled
+        self.t0 = t0 if t0 is not None else time.monotonic()
+        self.startup = process_age() if enabled else None   # interpreter + imports
+        self.phases: list[tuple[str, float]] = []
+        self.background: list[tuple[str, float]] = []
+        self.done = not enabled
+        self._last = self.t0
+        self._lock = threading.Lock()
+
+    def mark(self, phase: str) -> None:
+        """Close the current sequential phase."""
+        if self.done:
+            return
+        now = time.monotonic()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @contextmanager
+    def parallel(self, phase: str):
+        """Time work running alongside the sequential phases."""
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            if not self.done:
+                with self._lock:
+                    self.background.append((phase, time.monotonic() - start))
+
+    def finish(self, first_event_at: float) -> None:
+        """Close the last phase at the (monotonic) time of the first event."""
+        if self.done:
+            return
+        self.phases.append(("first event", max(first_event_at - self._last, 0.0)))
+        self.done = True
+        self.report(first_event_at)
+
+    def report(self, first_event_at: float) -> None:
+        total = first_event_at - self.t0
+        print("\nStartup profile" + "\n" + "-" * 40)
+        if self.startup is not None:
+            print(f"  {'python + imports':<24} {self.startup * 1000:8.1f} ms")
+            total += self.startup
+        for name, dt in self.phases:
+            print(f"  {name:<24} {dt * 1000:8.1f} ms")
+        for name, dt in self.background:
+            print(f"  {name + ' (bg)':<24} {dt * 1000:8.1f} ms")
+        print("-" * 40)
+        print(f"  {'time to first event':<24} {total * 1000:8.1f} ms\n")
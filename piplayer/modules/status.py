@@ -0,0 +1,116 @@
+# modules/status.py
+"""
+Out-of-process status reporting.
+
+The player pushes a compact JSON snapshot over a Unix datagram socket at a
+bounded rate.  Sends are non-blocking and silently dropped while nobody is
+listening, so a monitor (`piplayer-monitor`) can attach or detach at any
+time without the player noticing.
+
+Per-event state from the sequence worker (pin levels, lateness) lives in
+shared memory inherited through fork; the player only reads it when a
+snapshot is due.
+"""
+from __future__ import annotations
+
+import json
+import multiprocessing
+import os
+import socket
+import time
+from typing import Callable, Optional
+
+STATUS_SOCKET = "/tmp/piplayer-status.sock"
+PUBLISH_HZ    = 5.0
+MAX_PINS      = 128        # MIDI note range (note number = pin)
+MAX_DATAGRAM  = 65536
+
+
+class SequenceStatus:
+    """Shared between the player and its sequence worker (create before fork)."""
+
+    def __init__(self):
+        self.pins = multiprocessing.RawArray("b", MAX_PINS)
+        self.lateness = multiprocessing.RawArray("d", 2)   # [last, max] seconds
+        self.first_fire = multiprocessing.RawArray("d", 1) # monotonic, 0 = none yet
+        self.trigger = multiprocessing.RawArray("d", 2)    # [edge, edge → first event]
+
+    def reset(self) -> None:
+        for i in range(MAX_PINS):
+            self.pins[i] = 0
+        self.lateness[0] = self.lateness[1] = 0.0
+
+    # called by the worker, once per fired event
+    def record(self, pin: int, state: bool, late: float) -> None:
+        if not self.first_fire[0]:
+            self.first_fire[0] = time.monotonic()
+        self.pins[pin] = state
+        self.lateness[0] = late
+        if late > self.lateness[1]:
+            self.lateness[1] = late
+
+    # called by the worker, for the first event after a triggered play
+    def record_trigger(self, edge: float, latency: float) -> None:
+        self.trigger[1] = latency
+        self.trigger[0] = edge                   # last: marks the pair complete
+
+    def active_pins(self) -> list[int]:
+        return [i for i, v in enumerate(self.pins) if v]
+
+
+class StatusPublisher:
+    """Rate-limited, fire-and-forget sender of status snapshots."""
+
+    def __init__(self, path: str = STATUS_SOCKET, rate: float = PUBLISH_HZ):
+        self.path = path
+        self._interval = 1.0 / rate
+        self._next = 0.0
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.setblocking(False)
+
+    def maybe_publish(self, snapshot: Callable[[], dict]) -> None:
+        """Build and send a snapshot only if one is due."""
+        now = time.monotonic()
+        if now < self._next:
+            return
+        self._next = now + self._interval
+        try:
+            data = json.dumps(snapshot(), separators=(",", ":")).encode()
+            self._sock.sendto(data, self.path)
+        except OSError:
+            pass    # no monitor attached (or its buffer is full)
+
+    def close(self) -> None:
+        self._sock.close()
+
+
+class StatusListener:
+    """Monitor side: binds the socket and returns the newest snapshot."""
+
+    def __init__(self, path: str = STATUS_SOCKET):
+        self.path = path
+        if os.path.exists(path):
+            os.unlink(path)             # stale socket from a previous monitor
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sock.bind(path)
+        self._sock.setblocking(False)
+
+    def poll(self) -> Optional[dict]:
+        """Drain pending datagrams, return the latest (or None)."""
+        latest = None
+        while True:
+            try:
+                data = self._sock.recv(MAX_DATAGRAM)
+            except (BlockingIOError, InterruptedError):
+                return latest
+            try:
+                latest = json.loads(data.decode())
+            except ValueError:
+                continue
+
+    def close(self) -> None:
+        self._sock.close()
+        try:
+            os.unlink(self.path)
+        except OSError:
+            pass
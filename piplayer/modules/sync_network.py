@@ -1,5 +1,13 @@
 import socket, threading, time, json, collections, statistics, uuid
+import multiprocessing
 
+from . import tracing
+
+_T_SEND   = tracing.register("sync.send", "sync", arg="seq")
+_T_ACCEPT = tracing.register("sync.accept", "sync", arg="rtt_ms")
+_T_REJECT = tracing.register("sync.reject", "sync", arg="rtt_ms")
+_T_FIT    = tracing.register("sync.fit", "sync", arg="skew_ppm")
+_T_DRIFT  = tracing.register("sync.drift_ms", "sync")
 
 # ─── Configuration ───────────────────────────────────────────
 PORT            = 5005
@@ -17,8 +25,9 @@ TIMEOUT_S       = 2.0   # ⏱ stop trusting master after this idle time
 # ─── SyncMaster ──────────────────────────────────────────────
 class SyncMaster:
 
-    def __init__(self):
-        self._t0 = time.monotonic()
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+        self._t0 = clock()
         self.running = False
         self.session_id = str(uuid.uuid4())  # 💡 unique ID for this run
         self.seq = 0
@@ -32,35 +41,46 @@ class SyncMaster:
         sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
         sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
         while self.running:
-            now = time.monotonic()
-            pkt = {
-                "t": now - self._t0,
-                "sent": now,
-                "id": self.session_id,
-                "seq": self.seq
-            }
-            sock.sendto(json.dumps(pkt).encode(), (BROADCAST_IP, PORT))
-            self.seq += 1
+            sock.sendto(self._packet(), (BROADCAST_IP, PORT))
             time.sleep(SYNC_PERIOD_S)
 
+    def _packet(self) -> bytes:
+        now = self._clock()
+        pkt = {
+            "t": now - self._t0,
+            "sent": now,
+            "id": self.session_id,
+            "seq": self.seq
+        }
+        tracing.instant(_T_SEND, self.seq)
+        self.seq += 1
+        return json.dumps(pkt).encode()
+
+    def get_time(self) -> float:
+        """Master timeline (what followers lock to)."""
+        return self._clock() - self._t0
+
     def stop(self): self.running = False
 
 
 # ─── SyncFollower ────────────────────────────────────────────
 class SyncFollower:
-    def __init__(self):
+    def __init__(self, clock=time.monotonic):
 
-        self._t0 = time.monotonic()
+        self._clock = clock
+        self._t0 = clock()
         self._pairs = collections.deque(maxlen=WIN)
-        self._a = 1.0
-        self._b = 0.0
+        # local = a·master + b, plus a "valid" flag.  Kept in shared memory
+        # so forked workers (the sequence worker) follow every refit; a
+        # seqlock [seq, a, b, valid] keeps readers from a half-written pair.
+        self._fit = multiprocessing.RawArray("d", [0.0, 1.0, 0.0, 0.0])
         self._drifts = collections.deque(maxlen=10)
         self.running = False
         self._master_id = None
         self._last_received = 0.0
 
     def _local(self) -> float:
-        return time.monotonic() - self._t0
+        return self._clock() - self._t0
 
     def start(self):
         self.running = True
@@ -74,56 +94,79 @@ class SyncFollower:
         while self.running:
             try:
                 data, addr = sock.recvfrom(256)
-                recv = time.monotonic()
-                pkt = json.loads(data.decode())
-
-                t_m  = pkt.get("t")
-                sent = pkt.get("sent")
-                mid  = pkt.get("id")
-                seq  = pkt.get("seq")
-
-                if None in (t_m, sent, mid):
-                    continue
-
-                # Identity match
-                if self._master_id is None:
-                    self._master_id = mid
-                    print(f"[SyncFollower] Master locked: {mid[:8]}")
-                elif mid != self._master_id:
-                    print(f"[SyncFollower] Ignoring other master {mid[:8]}")
-                    continue
-
-                rtt = recv - sent
-                if rtt > OUTLIER_RTT:
-                    continue
-
-                one_way = rtt / 2
-                master_now = t_m + one_way
-                self._pairs.append((master_now, recv - self._t0))
-                self._last_received = recv
-
-                if len(self._pairs) >= 3:
-                    self._recalc_lr()
-
-                drift = master_now - self.get_time()
-                self._drifts.append(drift)
-
+                self._handle(data, self._clock())
             except Exception as e:
                 print("[SyncFollower] Error:", e)
 
+    def _handle(self, data: bytes, recv: float) -> None:
+        """Process one sync packet received at local clock time `recv`."""
+        pkt = json.loads(data.decode())
+
+        t_m  = pkt.get("t")
+        sent = pkt.get("sent")
+        mid  = pkt.get("id")
+        seq  = pkt.get("seq")
+
+        if None in (t_m, sent, mid):
+            return
+
+        # Identity match
+        if self._master_id is None:
+            self._master_id = mid
+            print(f"[SyncFollower] Master locked: {mid[:8]}")
+        elif mid != self._master_id:
+            print(f"[SyncFollower] Ignoring other master {mid[:8]}")
+            return
+
+        rtt = recv - sent
+        if rtt > OUTLIER_RTT:
+            tracing.instant(_T_REJECT, rtt * 1000)
+            return
+        tracing.instant(_T_ACCEPT, rtt * 1000)
+
+        one_way = rtt / 2
+        master_now = t_m + one_way
+        self._pairs.append((master_now, recv - self._t0))
+        self._last_received = recv
+
+        if len(self._pairs) >= 3:
+            self._recalc_lr()
+
+        if self.has_sync():
+            drift = master_now - self.get_time()
+            self._drifts.append(drift)
+            tracing.counter(_T_DRIFT, drift * 1000)
+
     def _recalc_lr(self):
+        t0 = tracing.now()
         xs, ys = zip(*self._pairs)
         mx, my = statistics.mean(xs), statistics.mean(ys)
         cov = sum((x - mx) * (y - my) for x, y in self._pairs)
         var = sum((x - mx)**2 for x in xs)
         if var > 1e-9:
-            self._a = cov / var
-            self._b = my - self._a * mx
+            a = cov / var
+            fit = self._fit
+            fit[0] += 1
+            fit[1] = a
+            fit[2] = my - a * mx
+            fit[3] = 1.0
+            fit[0] += 1
+        tracing.complete(_T_FIT, t0, (self._fit[1] - 1.0) * 1e6)
+
+    def fit(self) -> tuple:
+        """(a, b, valid) of local = a·master + b, read consistently."""
+        v = self._fit
+        while True:
+            seq = v[0]
+            a, b, valid = v[1], v[2], v[3]
+            if seq == v[0] and not int(seq) & 1:
+                return a, b, valid
 
     def get_time(self) -> float:
-        if len(self._pairs) < 3:
+        a, b, valid = self.fit()
+        if not valid:
             raise RuntimeError("[SyncFollower] No valid sync received.")
-        return (self._local() - self._b) / self._a
+        return (self._local() - b) / a
 
     get_synced_time = get_time  # for legacy calls
 
@@ -142,10 +185,10 @@ class SyncFollower:
         return abs(self.median_drift()) > SYNC_TOLERANCE
 
     def has_sync(self) -> bool:
-        return len(self._pairs) >= 3
+        return bool(self._fit[3])
 
     def has_active_master(self) -> bool:
-        return (time.monotonic() - self._last_received) < TIMEOUT_S
+        return (self._clock() - self._last_received) < TIMEOUT_S
 
     def stop(self): self.running = False
 
@@ -0,0 +1,77 @@
+# modules/synth_midi.py
+"""
+Synthetic MIDI files for benchmarks and timing tests.
+
+Every track plays random onsets (Poisson, `density` per second at the
+nominal 120 BPM) of `chord` simultaneous notes on distinct pins; a
+conductor track can add random tempo changes.  The same seed always
+gives the same file.
+"""
+from __future__ import annotations
+
+import random
+from typing import Sequence
+
+DEFAULT_PINS = tuple(range(2, 28))     # BCM pins on the 40-pin header
+PPQ          = 480
+NOMINAL_BPM  = 120.0
+
+
+def generate(
+    path: str,
+    tracks: int = 4,
+    duration: float = 30.0,           # seconds at the nominal tempo
+    density: float = 8.0,             # onsets per second per track
+    chord: int = 1,                   # notes per onset
+    tempo_changes: int = 0,
+    note_len: float = 0.5,            # fraction of the gap to the next onset
+    pins: Sequence[int] = DEFAULT_PINS,
+    seed: int = 0,
+) -> int:
+    """Write a type-1 MIDI file to `path`; returns the number of note events."""
+    from mido import Message, MetaMessage, MidiFile, MidiTrack, bpm2tempo
+
+    rng = random.Random(seed)
+    beats_per_s = NOMINAL_BPM / 60.0
+    end_tick = int(duration * beats_per_s * PPQ)
+    chord = max(1, min(chord, len(pins)))
+
+    mid = MidiFile(type=1, ticks_per_beat=PPQ)
+
+    # conductor: initial tempo plus random changes
+    conductor = [(0, MetaMessage("set_tempo", tempo=bpm2tempo(NOMINAL_BPM)))]
+    for _ in range(tempo_changes):
+        tick = rng.randrange(1, max(end_tick, 2))
+        conductor.append((tick, MetaMessage("set_tempo", tempo=bpm2tempo(rng.uniform(60, 180)))))
+    mid.tracks.append(_track(MidiTrack, conductor, "conductor"))
+
+    notes = 0
+    for t in range(tracks):
+        timed = []
+        tick = 0
+        while True:
+            gap = max(1, int(rng.expovariate(density) * beats_per_s * PPQ))
+            if tick + gap > end_tick:
+                break
+            length = max(1, int(gap * note_len))
+            for pin in rng.sample(list(pins), chord):
+                timed.append((tick, Message("note_on", note=pin, velocity=100)))
+                timed.append((tick + length, Message("note_off", note=pin)))
+                notes += 2
+            tick += gap
+        mid.tracks.append(_track(MidiTrack, timed, f"Track-{t + 1}"))
+
+    mid.save(path)
+    return notes
+
+
+def _track(track_cls, timed: list, name: str):
+    """Absolute-tick messages → a MidiTrack with delta times."""
+    from mido import MetaMessage
+    track = track_cls()
+    track.append(MetaMessage("track_name", name=name, time=0))
+    last = 0
+    for tick, msg in sorted(timed, key=lambda tm: tm[0]):
+        track.append(msg.copy(time=tick - last))
+        last = tick
+    return track
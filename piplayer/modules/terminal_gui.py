@@ -1,29 +1,65 @@
 # modules/terminal_gui.py
-import curses
 import threading
 import time
 
+from . import tracing
+
+DEFAULT_FPS = 20.0
+
+_T_FRAME = tracing.register("gui.frame", "gui")
+
+
 class TerminalGUI:
     """
     Real-time playback monitor with per-track progress bars and mm:ss display.
+
+    Lanes (track name + note-on markers) are rendered once per terminal
+    size; each frame only moves the ▶ cursor and rewrites the clock when
+    its text changes, so the cost per frame does not depend on the number
+    of events.
     """
 
-    def __init__(self, total_seconds: float, track_events: dict[str, list[float]]):
+    def __init__(self, total_seconds: float, track_events: dict[str, list[float]],
+                 fps: float = DEFAULT_FPS):
         self.total = max(total_seconds, 0.001)
         self.track_events = track_events  # Dict of track name -> list of note-on times
         self.track_names = list(track_events.keys())
+        self.fps = max(fps, 1.0)
         self._stop = False
         self._thread: threading.Thread | None = None
+        self._curses = None
         self.now = 0.0
+        self._now_at = time.monotonic()
+
+        # render cache (rebuilt on resize)
+        self._size: tuple[int, int] = (0, 0)
+        self._bar_w = 0
+        self._lane_x = 0
+        self._lanes: list[str] = []
+        self._cursor = -1
+        self._time_str = ""
+        self.status = ""
+        self._status_str = ""
+
+    @classmethod
+    def for_events(cls, events, total_seconds: float,
+                   fps: float = DEFAULT_FPS) -> "TerminalGUI":
+        """Build lanes from a list of MidiEvents (note-ons only)."""
+        track_events: dict[str, list[float]] = {}
+        for ev in events:
+            if ev.msg.type == "note_on" and ev.msg.velocity > 0:
+                track_events.setdefault(ev.track, []).append(ev.time_s)
+        return cls(total_seconds, track_events, fps=fps)
 
     def start(self) -> None:
-        self.start_time = time.monotonic()
+        self.reset()
         self._stop = False
         self._thread = threading.Thread(target=self._run, daemon=True)
         self._thread.start()
 
     def update(self, seconds_elapsed: float) -> None:
         self.now = seconds_elapsed
+        self._now_at = time.monotonic()
 
     def stop(self) -> None:
         self._stop = True
@@ -31,57 +67,105 @@ class TerminalGUI:
             self._thread.join()
 
     def _run(self) -> None:
+        import curses       # deferred: only paid for when a GUI is shown
+        self._curses = curses
         curses.wrapper(self._curses_main)
 
+    def set_status(self, text: str) -> None:
+        """One line of free text shown under the clock."""
+        self.status = text
+
+    def set_total(self, total_seconds: float) -> None:
+        """New show length; the lanes are re-rendered on the next frame."""
+        total = max(total_seconds, 0.001)
+        if total != self.total:
+            self.total = total
+            self._size = (0, 0)
+
     def reset(self) -> None:
         """Reset GUI timer (for clean loop restarts)."""
-        self.start_time = time.monotonic()
+        self.update(0.0)
+
+    def position(self) -> float:
+        """Last reported position, extrapolated to now."""
+        return self.now + (time.monotonic() - self._now_at)
+
+    # -----------------------------------------------------------------
+    def _layout(self, stdscr) -> None:
+        """Pre-render every lane for the current terminal width."""
+        max_y, max_x = self._size
+        label_w = max([6] + [len(t) for t in self.track_names])
+        label_w = min(label_w, max(max_x // 3, 6))
+        self._lane_x = 2 + label_w + 2                 # "  name [" …
+        self._bar_w = max(max_x - self._lane_x - 10, 10)
+
+        self._lanes = []
+        for track in self.track_names:
+            cells = ["-"] * self._bar_w
+            for t in self.track_events.get(track, []):
+                ev_pos = min(int((t / self.total) * self._bar_w), self._bar_w - 1)
+                cells[ev_pos] = "●"
+            self._lanes.append("".join(cells))
+
+        stdscr.erase()
+        self._put(stdscr, 1, 2, " PiPlayer Monitor ")
+        for idx, track in enumerate(self.track_names):
+            label = track[:label_w].ljust(label_w)
+            self._put(stdscr, 3 + idx, 2, f"{label} [{self._lanes[idx]}]")
+        self._cursor = -1
+        self._time_str = ""
+        self._status_str = ""
+
+    def _draw_cursor(self, stdscr, pos: int) -> None:
+        for idx, lane in enumerate(self._lanes):
+            y = 3 + idx
+            if self._cursor >= 0:
+                self._put(stdscr, y, self._lane_x + self._cursor, lane[self._cursor])
+            self._put(stdscr, y, self._lane_x + pos, "▶")
+        self._cursor = pos
+
+    def _draw_clock(self, stdscr, now: float) -> None:
+        now_m, now_s = divmod(int(now), 60)
+        total_m, total_s = divmod(int(self.total), 60)
+        time_str = f"{now_m:02}:{now_s:02} / {total_m:02}:{total_s:02}"
+        if time_str != self._time_str:
+            self._put(stdscr, 5 + len(self.track_names), 2, time_str)
+            self._time_str = time_str
+
+    def _draw_status(self, stdscr) -> None:
+        if self.status != self._status_str:
+            width = max(len(self._status_str), len(self.status))
+            self._put(stdscr, 6 + len(self.track_names), 2, self.status.ljust(width))
+            self._status_str = self.status
+
+    def _put(self, stdscr, y: int, x: int, text: str) -> None:
+        # curses raises when writing past the bottom-right corner
+        try:
+            stdscr.addstr(y, x, text)
+        except self._curses.error:
+            pass
 
     def _curses_main(self, stdscr):
-        curses.curs_set(0)
+        self._curses.curs_set(0)
         stdscr.nodelay(True)
+        frame = 1.0 / self.fps
 
         while not self._stop:
-            stdscr.erase()
-            max_y, max_x = stdscr.getmaxyx()
-            bar_w = max(max_x - 20, 10)  # leave space for labels + timestamp
-
-            # Update "now" from time.monotonic
-            now_monotonic = time.monotonic() - self.start_time
-            self.now = now_monotonic
-
-            # Time strings
-            now_m, now_s = divmod(int(self.now), 60)
-            total_m, total_s = divmod(int(self.total), 60)
-            time_str = f"{now_m:02}:{now_s:02} / {total_m:02}:{total_s:02}"
-
-            # Title
-            stdscr.addstr(1, 2, " PiPlayer Monitor ")
-
-            # Draw each track
-            for idx, track in enumerate(self.track_names):
-                y = 3 + idx
-                pct = min(self.now / self.total, 1.0)
-                filled = int(pct * bar_w)
-                line = "-" * bar_w
-
-                events = self.track_events.get(track, [])
-
-                # Overlay note-on events
-                for t in events:
-                    ev_pos = int((t / self.total) * bar_w)
-                    ev_pos = min(ev_pos, bar_w - 1)
-                    line = line[:ev_pos] + "●" + line[ev_pos + 1:]
-
-                # Overlay moving position
-                dot_pos = min(filled, bar_w - 1)
-                line = line[:dot_pos] + "▶" + line[dot_pos + 1:]
-
-                stdscr.addstr(y, 2, f"{track:<6} [{line}]")
-
-            # Draw time info under all tracks
-            stdscr.addstr(5 + len(self.track_names), 2, time_str)
+            t0 = tracing.now()
+            size = stdscr.getmaxyx()
+            if size != self._size:
+                self._size = size
+                self._layout(stdscr)
+            stdscr.getch()                      # drain input / KEY_RESIZE
+
+            now = max(self.position(), 0.0)
+            pct = min(now / self.total, 1.0)
+            pos = min(int(pct * self._bar_w), self._bar_w - 1)
+            if pos != self._cursor:
+                self._draw_cursor(stdscr, pos)
+            self._draw_clock(stdscr, now)
+            self._draw_status(stdscr)
 
             stdscr.refresh()
-            time.sleep(0.05)
-
+            tracing.complete(_T_FRAME, t0)
+            time.sleep(frame)
@@ -0,0 +1,230 @@
+# modules/tracing.py
+"""
+Opt-in hot-path tracing (`piplayer --trace show.json`), Chrome trace format.
+
+Call sites register their event names once at import time and then
+record instants, complete spans and counters by id:
+
+    _SEEK = tracing.register("audio.seek", "audio", arg="target_s")
+    ...
+    t0 = tracing.now()
+    player.seek(target)
+    tracing.complete(_SEEK, t0, target)
+
+While tracing is off every call returns after one global check.  When it
+is on, each process writes into its own slot of a shared-memory ring
+buffer (a forked child claims a slot at fork time), so nothing is sent
+between processes while playing.  The process that enabled tracing
+merges all slots into one JSON file on exit; open it in Perfetto
+(ui.perfetto.dev) or chrome://tracing.
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import multiprocessing
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional
+
+MAX_PROCS        = 8
+DEFAULT_CAPACITY = 1 << 16        # events per process (oldest overwritten)
+NAME_BYTES       = 32
+
+KIND_INSTANT, KIND_COMPLETE, KIND_COUNTER = 0, 1, 2
+
+# (name, category, arg label) by id — filled at import time, inherited through fork
+_names: list[tuple[str, str, Optional[str]]] = []
+
+_buf = None                       # _Buffers while enabled, else None
+_slot: Optional[int] = None       # this process' slot
+_fork_lock = threading.Lock()
+_put_lock = threading.Lock()      # threads of one process share its slot
+_reserved: Optional[int] = None
+
+
+def register(name: str, cat: str, arg: Optional[str] = None) -> int:
+    """Declare an event name (module level, before anything forks)."""
+    _names.append((name, cat, arg))
+    return len(_names) - 1
+
+
+class _Buffers:
+    def __init__(self, capacity: int, path: str):
+        size = MAX_PROCS * capacity
+        self.capacity = capacity
+        self.path = path
+        self.t0 = time.monotonic()
+        self.owner = os.getpid()
+        self.ts = multiprocessing.RawArray("d", size)
+        self.dur = multiprocessing.RawArray("d", size)
+        self.val = multiprocessing.RawArray("d", size)
+        self.name = multiprocessing.RawArray("H", size)
+        self.kind = multiprocessing.RawArray("B", size)
+        self.tid = multiprocessing.RawArray("i", size)
+        self.count = multiprocessing.RawArray("Q", MAX_PROCS)
+        self.pid = multiprocessing.RawArray("i", MAX_PROCS)
+        self.label = multiprocessing.RawArray("c", MAX_PROCS * NAME_BYTES)
+        self.slots = multiprocessing.RawValue("i", 1)        # slot 0: the owner
+        self.pid[0] = self.owner
+
+
+# ─────────────────────────── control ───────────────────────────
+def enable(path: str, capacity: int = DEFAULT_CAPACITY, process_name: str = "piplayer") -> None:
+    """Start tracing in this process and every process forked from now on."""
+    global _buf, _slot
+    _buf = _Buffers(capacity, path)
+    _slot = 0
+    set_process_name(process_name)
+    atexit.register(write)
+
+
+def enabled() -> bool:
+    return _slot is not None
+
+
+def set_process_name(name: str) -> None:
+    """Label this process' track in the trace viewer."""
+    if _slot is None:
+        return
+    raw = name.encode()[:NAME_BYTES].ljust(NAME_BYTES, b"\0")
+    start = _slot * NAME_BYTES
+    _buf.label[start:start + NAME_BYTES] = raw
+
+
+def _before_fork() -> None:
+    # runs in the parent: reserve the child's slot while we still can count
+    global _reserved
+    _reserved = None
+    if _slot is not None:
+        with _fork_lock:
+            if _buf.slots.value < MAX_PROCS:
+                _reserved = _buf.slots.value
+                _buf.slots.value += 1
+
+
+def _after_fork_child() -> None:
+    global _slot, _put_lock
+    _put_lock = threading.Lock()          # may have been held by another thread at fork
+    _slot = _reserved                     # None: out of slots, child not traced
+    if _slot is not None:
+        _buf.pid[_slot] = os.getpid()
+        _buf.count[_slot] = 0
+        set_process_name(f"pid {os.getpid()}")
+
+
+os.register_at_fork(before=_before_fork, after_in_child=_after_fork_child)
+
+
+# ─────────────────────────── recording ───────────────────────────
+now = time.monotonic
+
+
+def _put(kind: int, name: int, ts: float, dur: float, val: float) -> None:
+    b, slot = _buf, _slot
+    tid = threading.get_native_id()
+    with _put_lock:
+        n = b.count[slot]
+        i = slot * b.capacity + n % b.capacity
+        b.ts[i] = ts
+        b.dur[i] = dur
+        b.val[i] = val
+        b.name[i] = name
+        b.kind[i] = kind
+        b.tid[i] = tid
+        b.count[slot] = n + 1
+
+
+def instant(name: int, value: float = 0.0) -> None:
+    if _slot is None:
+        return
+    _put(KIND_INSTANT, name, time.monotonic(), 0.0, value)
+
+
+def complete(name: int, start: float, value: float = 0.0) -> None:
+    """A span from `start` (tracing.now()) until now."""
+    if _slot is None:
+        return
+    _put(KIND_COMPLETE, name, start, time.monotonic() - start, value)
+
+
+def counter(name: int, value: float) -> None:
+    if _slot is None:
+        return
+    _put(KIND_COUNTER, name, time.monotonic(), 0.0, value)
+
+
+class _NullSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+def span(name: int, value: float = 0.0):
+    """``with tracing.span(ID): ...`` — free when tracing is off."""
+    if _slot is None:
+        return _NULL_SPAN
+    return _span(name, value)
+
+
+@contextmanager
+def _span(name: int, value: float):
+    start = time.monotonic()
+    try:
+        yield
+    finally:
+        complete(name, start, value)
+
+
+# ─────────────────────────── export ───────────────────────────
+def events() -> list[dict]:
+    """All slots as Chrome trace events (timestamps in µs since enable())."""
+    b = _buf
+    out = []
+    for slot in range(b.slots.value):
+        pid = b.pid[slot]
+        label = bytes(b.label[slot * NAME_BYTES:(slot + 1) * NAME_BYTES]).rstrip(b"\0")
+        out.append({"ph": "M", "name": "process_name", "pid": pid, "tid": 0,
+                    "args": {"name": label.decode(errors="replace")}})
+        n = b.count[slot]
+        kept = min(n, b.capacity)
+        for j in range(n - kept, n):
+            i = slot * b.capacity + j % b.capacity
+            name_id = b.name[i]
+            name, cat, arg = (_names[name_id] if name_id < len(_names)
+                              else (f"event-{name_id}", "unknown", None))
+            ev = {"name": name, "cat": cat, "pid": pid, "tid": b.tid[i],
+                  "ts": round((b.ts[i] - b.t0) * 1e6, 3)}
+            kind = b.kind[i]
+            if kind == KIND_COUNTER:
+                ev["ph"] = "C"
+                ev["args"] = {arg or name: b.val[i]}
+            else:
+                if kind == KIND_COMPLETE:
+                    ev["ph"] = "X"
+                    ev["dur"] = round(b.dur[i] * 1e6, 3)
+                else:
+                    ev["ph"] = "i"
+                    ev["s"] = "t"
+                if arg:
+                    ev["args"] = {arg: b.val[i]}
+            out.append(ev)
+    return out
+
+
+def write() -> None:
+    """Merge every process' buffer into the trace file (owner process only)."""
+    if _buf is None or os.getpid() != _buf.owner:
+        return
+    evs = events()
+    evs.sort(key=lambda e: e.get("ts", 0.0))
+    with open(_buf.path, "w") as f:
+        json.dump({"traceEvents": evs, "displayTimeUnit": "ms"}, f)
+    print(f"[Tracing] {len(evs)} events → {_buf.path}")
@@ -0,0 +1,91 @@
+# monitor.py
+"""
+piplayer-monitor – curses GUI that runs *outside* the player process.
+
+It listens on the status socket (see modules/status.py) and can be
+started or quit at any time while a show is running.
+"""
+import argparse
+import time
+
+from .modules.status import StatusListener, STATUS_SOCKET
+from .modules.terminal_gui import TerminalGUI, DEFAULT_FPS
+
+STALE_S = 2.0      # no snapshot for this long → player gone / stopped
+
+
+def _load_events(sequence_file):
+    if not sequence_file:
+        return []
+    try:
+        from .modules.sequence_layers import load_sequence
+        return load_sequence(sequence_file).events
+    except Exception as e:
+        print(f"[Monitor] Can't load {sequence_file}: {e}")
+        return []
+
+
+def _format(snap: dict) -> str:
+    parts = [f"mode={snap.get('mode')}", f"loop={snap.get('loop', 0)}"]
+    if snap.get("drift") is not None:
+        parts.append(f"audio drift={snap['drift']:+.3f}s")
+    if snap.get("sync") is not None:
+        parts.append(f"sync={snap['sync']:+.3f}s")
+    parts.append(f"late={snap.get('late', 0.0) * 1000:.1f}ms "
+                 f"(max {snap.get('late_max', 0.0) * 1000:.1f}ms)")
+    pins = snap.get("pins") or []
+    parts.append("pins=" + (",".join(map(str, pins)) if pins else "-"))
+    return "  ".join(parts)
+
+
+# -------------------------------------------------------------------- #
+def main() -> None:
+    p = argparse.ArgumentParser(description="PiPlayer status monitor")
+    p.add_argument("--socket", default=STATUS_SOCKET,
+                   help=f"Status socket (default: {STATUS_SOCKET})")
+    p.add_argument("--fps", type=float, default=DEFAULT_FPS,
+                   help=f"Refresh rate (default: {DEFAULT_FPS:g})")
+    args = p.parse_args()
+
+    listener = StatusListener(args.socket)
+    print(f"[Monitor] Waiting for player on {args.socket} …")
+
+    gui = None
+    shown = None
+    last_seen = 0.0
+    try:
+        while True:
+            snap = listener.poll()
+            now = time.monotonic()
+
+            if snap:
+                last_seen = now
+                show = snap.get("sequence")
+                if gui is None or show != shown:
+                    if gui:
+                        gui.stop()
+                    gui = TerminalGUI.for_events(_load_events(show),
+                                                 snap.get("total") or 0.0, fps=args.fps)
+                    gui.start()
+                    shown = show
+                else:
+                    gui.set_total(snap.get("total") or 0.0)   # grows while streaming
+                gui.update(snap.get("pos", 0.0))
+                gui.set_status(_format(snap))
+
+            elif gui and now - last_seen > STALE_S:
+                gui.update(gui.now)             # freeze the cursor
+                gui.set_status("no player (waiting for snapshots…)")
+
+            time.sleep(1.0 / args.fps)
+
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if gui:
+            gui.stop()
+        listener.close()
+
+
+if __name__ == "__main__":
+    main()
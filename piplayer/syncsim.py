@@ -0,0 +1,375 @@
+# syncsim.py
+"""
+piplayer-syncsim – SyncMaster + many SyncFollowers on a virtual network.
+
+Nothing real is involved: every node reads its own virtual clock (offset
+and skew against simulated time), packets are the real encoded sync
+packets handed to SyncFollower._handle, and a seeded event queue decides
+delay, jitter, loss and reordering.  The same seed gives the same run, in
+a fraction of the simulated time.
+
+    piplayer-syncsim --followers 20 --jitter 0.01 --loss 0.05 --skew 100
+    piplayer-syncsim --set WIN=40 --set OUTLIER_RTT=0.05 --out win40.json
+    piplayer-syncsim --audio --duration 3600 --set SEEK_THRESHOLD=0.05
+
+Reported per run: time to first fit and to lock (error within --tolerance
+for the rest of the run), steady-state offset error after --warmup and the
+CPU one follower spends on sync packets.
+
+With --audio every follower also runs AudioPlayer's follower sync loop
+(_sync_step) against a simulated mpv: playback runs on the node's clock,
+and a seek holds the position at its target for --seek-delay before
+playback resumes.  The heard audio error against master time and the
+number of seeks are reported as well.
+"""
+import argparse
+import contextlib
+import heapq
+import io
+import json
+import math
+import random
+import time
+from typing import Optional
+
+from .modules import audio_player, sync_network
+from .modules.audio_player import AudioPlayer
+from .modules.sync_network import SyncMaster, SyncFollower
+
+TUNABLES = {
+    **{name: sync_network for name in
+       ("SYNC_PERIOD_S", "OUTLIER_RTT", "WIN", "TIMEOUT_S")},
+    **{name: audio_player for name in
+       ("SEEK_THRESHOLD", "LARGE_DRIFT", "SEEK_COOLDOWN", "SEEK_SETTLE",
+        "PREDICTIVE_LEAD", "SYNC_POLL", "STABLE_POLL")},
+}
+
+
+class NodeClock:
+    """Local monotonic clock of one node: offset + true time × (1 + skew)."""
+
+    def __init__(self, sim: "Simulation", offset: float = 0.0, skew_ppm: float = 0.0):
+        self.sim = sim
+        self.offset = offset
+        self.rate = 1.0 + skew_ppm * 1e-6
+
+    def __call__(self) -> float:
+        return self.offset + self.sim.now * self.rate
+
+
+class VirtualMpv:
+    """
+    The part of mpv AudioPlayer's sync loop sees.  Playback advances on the
+    node's clock; a seek freezes time_pos at its target for `seek_delay`
+    (decoder refill) before it runs again.  time_pos is ahead of what is
+    heard by the player's latency, as AudioPlayer assumes.
+    """
+
+    def __init__(self, clock: NodeClock, latency: float, seek_delay: float):
+        self.clock = clock
+        self.latency = latency
+        self.seek_delay = seek_delay
+        self.seeks = 0
+        self._pos, self._from = 0.0, clock()
+
+    def heard(self) -> float:
+        return self._pos + max(0.0, self.clock() - self._from)
+
+    @property
+    def time_pos(self) -> float:
+        return self.heard() + self.latency
+
+    def seek(self, target: float, reference: str = "absolute") -> None:
+        self.seeks += 1
+        self._pos = target - self.latency
+        self._from = self.clock() + self.seek_delay
+
+
+class Simulation:
+    def __init__(self, followers: int = 10, duration: float = 60.0,
+                 delay: float = 0.002, jitter: float = 0.002, loss: float = 0.0,
+                 reorder: float = 0.0, skew_ppm: float = 50.0,
+                 clock_offset: float = 0.0, join_spread: float = 0.0,
+                 sample_s: float = 0.1, tolerance: float = 0.005, warmup: float = 10.0,
+                 seed: int = 0, audio: bool = False, seek_delay: float = 0.1):
+        self.rng = random.Random(seed)
+        self.now = 0.0
+        self.duration = duration
+        self.delay, self.jitter = delay, jitter
+        self.loss, self.reorder = loss, reorder
+        self.sample_s = sample_s
+        self.tolerance = tolerance
+        self.warmup = warmup
+
+        self.master = SyncMaster(clock=NodeClock(self, self._offset(clock_offset),
+                                                 self._skew(skew_ppm)))
+        self.n = followers
+        self.clocks = [NodeClock(self, self._offset(clock_offset), self._skew(skew_ppm))
+                       for _ in range(followers)]
+        self.joined_at = [self.rng.uniform(0.0, join_spread) for _ in range(followers)]
+        self.followers: list[Optional[SyncFollower]] = [None] * followers
+
+        self.errors: list[list[tuple[float, float]]] = [[] for _ in range(followers)]
+        self.cpu = [0.0] * followers
+        self.audio = audio
+        self.seek_delay = seek_delay
+        self.players: list[Optional[AudioPlayer]] = [None] * followers
+        self.audio_errors: list[list[tuple[float, float]]] = [[] for _ in range(followers)]
+        self.packets = [0] * followers
+        self.sent = self.dropped = 0
+
+        self._queue: list = []
+        self._seq = 0
+
+    def _offset(self, spread: float) -> float:
+        return self.rng.uniform(0.0, spread) if spread else 0.0
+
+    def _skew(self, ppm: float) -> float:
+        return self.rng.uniform(-ppm, ppm) if ppm else 0.0
+
+    def _at(self, t: float, kind: str, data=None) -> None:
+        heapq.heappush(self._queue, (t, self._seq, kind, data))
+        self._seq += 1
+
+    # ─────────────────────────── network ───────────────────────────
+    def _transit(self) -> Optional[float]:
+        """One-way latency of a packet, None if it is lost."""
+        if self.rng.random() < self.loss:
+            return None
+        d = self.delay
+        if self.jitter:
+            d += self.rng.expovariate(1.0 / self.jitter)      # long tail, like wifi
+        if self.rng.random() < self.reorder:
+            d += self.rng.uniform(0.0, 2 * sync_network.SYNC_PERIOD_S)   # held back
+        return d
+
+    # ─────────────────────────── run ───────────────────────────
+    def run(self) -> dict:
+        period = sync_network.SYNC_PERIOD_S
+        for k in range(int(self.duration / period) + 1):
+            self._at(k * period, "send")
+        for i, t in enumerate(self.joined_at):
+            self._at(t, "join", i)
+        for k in range(1, int(self.duration / self.sample_s) + 1):
+            self._at(k * self.sample_s, "sample")
+
+        while self._queue:
+            t, _, kind, data = heapq.heappop(self._queue)
+            if t > self.duration:
+                break
+            self.now = t
+            if kind == "send":
+                pkt = self.master._packet()
+                self.sent += 1
+                for i in range(self.n):
+                    d = self._transit()
+                    if d is None:
+                        self.dropped += 1
+                    else:
+                        self._at(t + d, "recv", (i, pkt))
+            elif kind == "recv":
+                i, pkt = data
+                f = self.followers[i]
+                if f is None:
+                    continue                      # not listening yet
+                c0 = time.process_time()
+                try:
+                    f._handle(pkt, f._clock())
+                except Exception as e:
+                    print("[SyncSim] follower error:", e)
+                self.cpu[i] += time.process_time() - c0
+                self.packets[i] += 1
+                if self.audio and self.players[i] is None and f.has_sync():
+                    self._start_audio(i, t)
+            elif kind == "audio":
+                i = data
+                wait = self.players[i]._sync_step(self.clocks[i]())
+                self._at(t + wait, "audio", i)
+            elif kind == "join":
+                self.followers[data] = SyncFollower(clock=self.clocks[data])
+            elif kind == "sample":
+                master_t = self.master.get_time()
+                for i, f in enumerate(self.followers):
+                    if f is not None and f.has_sync():
+                        self.errors[i].append((t - self.joined_at[i], f.get_time() - master_t))
+                    ap = self.players[i]
+                    if ap is not None:
+                        self.audio_errors[i].append((t - self.joined_at[i],
+                                                     ap._player.heard() - master_t))
+        return self.report()
+
+    def _start_audio(self, i: int, t: float) -> None:
+        """AudioPlayer.start(follower) on node i, with a VirtualMpv for mpv."""
+        f, clock = self.followers[i], self.clocks[i]
+        ap = AudioPlayer("")
+        ap._player = VirtualMpv(clock, ap.latency, self.seek_delay)
+        ap._follower = f
+        ap._player.seek(max(0.0, f.get_time() + audio_player.PREDICTIVE_LEAD))
+        ap._last_seek = float("-inf")           # start() uses 0.0: long ago on a real clock
+        ap._settle_until = clock() + audio_player.SEEK_SETTLE
+        self.players[i] = ap
+        self._at(t, "audio", i)
+
+    # ─────────────────────────── results ───────────────────────────
+    def _lock(self, i: int) -> Optional[float]:
+        """Time after joining from which the error stays within tolerance."""
+        lock = None
+        for t, err in self.errors[i]:
+            if abs(err) > self.tolerance:
+                lock = None
+            elif lock is None:
+                lock = t
+        return lock
+
+    def report(self) -> dict:
+        first_fit, locks, steady, signed = [], [], [], []
+        for i in range(self.n):
+            if self.errors[i]:
+                first_fit.append(self.errors[i][0][0])
+            lock = self._lock(i)
+            if lock is not None:
+                locks.append(lock)
+            for t, err in self.errors[i]:
+                if t >= self.warmup:
+                    steady.append(abs(err))
+                    signed.append(err)
+        steady.sort()
+        locks.sort()
+        per_packet = [c / p for c, p in zip(self.cpu, self.packets) if p]
+        out = {
+            "followers":      self.n,
+            "locked":         len(locks),
+            "never_locked":   self.n - len(locks),
+            "first_fit_s":    round(max(first_fit), 3) if first_fit else None,
+            "lock_s": {
+                "p50": round(_pct(locks, 50), 3) if locks else None,
+                "max": round(locks[-1], 3) if locks else None,
+            },
+            "error_ms": {
+                "bias": round(sum(signed) / len(signed) * 1000, 4) if signed else None,
+                "p50":  round(_pct(steady, 50) * 1000, 4) if steady else None,
+                "p95":  round(_pct(steady, 95) * 1000, 4) if steady else None,
+                "p99":  round(_pct(steady, 99) * 1000, 4) if steady else None,
+                "max":  round(steady[-1] * 1000, 4) if steady else None,
+            },
+            "packets":        {"sent": self.sent, "dropped": self.dropped},
+            "cpu_us_per_packet": round(sum(per_packet) / len(per_packet) * 1e6, 2)
+                                 if per_packet else None,
+            "cpu_pct_per_follower": round(100.0 * sum(self.cpu) / self.n / self.duration, 4)
+                                    if self.n else 0.0,
+        }
+        if self.audio:
+            heard = sorted(abs(err) for errs in self.audio_errors
+                           for t, err in errs if t >= self.warmup)
+            seeks = [ap._player.seeks - 1 for ap in self.players if ap]   # minus the initial one
+            out["audio"] = {
+                "started":   len(seeks),
+                "seeks":     sum(seeks),
+                "error_ms": {
+                    "p50": round(_pct(heard, 50) * 1000, 4) if heard else None,
+                    "p95": round(_pct(heard, 95) * 1000, 4) if heard else None,
+                    "max": round(heard[-1] * 1000, 4) if heard else None,
+                },
+            }
+        return out
+
+
+def _pct(sorted_values: list, q: float) -> float:
+    k = max(0, min(len(sorted_values), math.ceil(q / 100.0 * len(sorted_values))) - 1)
+    return sorted_values[k]
+
+
+def _apply_tunables(pairs: list) -> dict:
+    """--set NAME=value → patch sync_network's / audio_player's module constants."""
+    applied = {}
+    for pair in pairs:
+        name, _, value = pair.partition("=")
+        if name not in TUNABLES:
+            raise SystemExit(f"--set: {name!r} is not one of {', '.join(TUNABLES)}")
+        module = TUNABLES[name]
+        setattr(module, name, type(getattr(module, name))(value))
+        applied[name] = getattr(module, name)
+    return applied
+
+
+def _print_report(res: dict) -> None:
+    err, lock = res["error_ms"], res["lock_s"]
+    line = f"[SyncSim] locked {res['locked']}/{res['followers']}"
+    if lock["p50"] is not None:
+        line += f"  lock p50={lock['p50']}s max={lock['max']}s"
+    if res["first_fit_s"] is not None:
+        line += f"  first fit ≤{res['first_fit_s']}s"
+    print(line)
+    if err["p50"] is not None:
+        print(f"[SyncSim] steady error |p50|={err['p50']:.3f} p95={err['p95']:.3f} "
+              f"p99={err['p99']:.3f} max={err['max']:.3f} ms  bias={err['bias']:+.3f} ms")
+    print(f"[SyncSim] packets sent={res['packets']['sent']} dropped={res['packets']['dropped']}  "
+          f"cpu {res['cpu_us_per_packet']} µs/packet, "
+          f"{res['cpu_pct_per_follower']}% per follower")
+    audio = res.get("audio")
+    if audio:
+        err = audio["error_ms"]
+        line = f"[SyncSim] audio: {audio['started']} playing, {audio['seeks']} seeks"
+        if err["p50"] is not None:
+            line += f"  heard error |p50|={err['p50']:.3f} p95={err['p95']:.3f} max={err['max']:.3f} ms"
+        print(line)
+
+
+# -------------------------------------------------------------------- #
+def main() -> None:
+    p = argparse.ArgumentParser(description="Simulated network sync benchmark")
+    p.add_argument("--followers", type=int, default=10)
+    p.add_argument("--duration", type=float, default=60.0, help="Simulated seconds")
+    p.add_argument("--delay", type=float, default=0.002, help="Base one-way delay (s)")
+    p.add_argument("--jitter", type=float, default=0.002, help="Mean extra delay (s)")
+    p.add_argument("--loss", type=float, default=0.0, help="Packet loss probability")
+    p.add_argument("--reorder", type=float, default=0.0,
+                   help="Probability a packet is held back up to two sync periods")
+    p.add_argument("--skew", type=float, default=50.0, help="Max clock skew per node (ppm)")
+    p.add_argument("--clock-offset", type=float, default=0.0,
+                   help="Max random offset between node clocks (s); 0 = same host")
+    p.add_argument("--join-spread", type=float, default=0.0,
+                   help="Followers start at random times within this window (s)")
+    p.add_argument("--tolerance", type=float, default=0.005,
+                   help="Locked = offset error within this (s, default 0.005)")
+    p.add_argument("--warmup", type=float, default=10.0,
+                   help="Steady-state error counts samples this long after joining (s)")
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--audio", action="store_true",
+                   help="Also run AudioPlayer's follower seek loop on a simulated mpv")
+    p.add_argument("--seek-delay", type=float, default=0.1,
+                   help="--audio: time a seek takes before playback resumes (s)")
+    p.add_argument("--set", action="append", default=[], metavar="NAME=VALUE",
+                   help=f"Override a sync or audio constant ({', '.join(TUNABLES)})")
+    p.add_argument("--out", help="Write results as JSON")
+    p.add_argument("--verbose", action="store_true", help="Show follower log lines")
+    args = p.parse_args()
+
+    tunables = _apply_tunables(args.set)
+    sim = Simulation(followers=args.followers, duration=args.duration,
+                     delay=args.delay, jitter=args.jitter, loss=args.loss,
+                     reorder=args.reorder, skew_ppm=args.skew,
+                     clock_offset=args.clock_offset, join_spread=args.join_spread,
+                     tolerance=args.tolerance, warmup=args.warmup, seed=args.seed,
+                     audio=args.audio, seek_delay=args.seek_delay)
+
+    wall0 = time.monotonic()
+    log = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    with log:
+        res = sim.run()
+    print(f"[SyncSim] {args.duration:g}s simulated in {time.monotonic() - wall0:.2f}s")
+    _print_report(res)
+
+    if args.out:
+        params = {k: getattr(args, k) for k in
+                  ("followers", "duration", "delay", "jitter", "loss", "reorder",
+                   "skew", "clock_offset", "join_spread", "tolerance", "warmup", "seed",
+                   "audio", "seek_delay")}
+        params["constants"] = {name: getattr(module, name) for name, module in TUNABLES.items()}
+        with open(args.out, "w") as f:
+            json.dump({"params": params, "result": res}, f, indent=2)
+        print(f"[SyncSim] results → {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -21,6 +21,10 @@ setup(
         "console_scripts": [
             "piplayer=piplayer.cli:main",
             "piplayer-setup=piplayer.piplayer_setup:main",
+            "piplayer-monitor=piplayer.monitor:main",
+            "piplayer-bench=piplayer.bench:main",
+            "piplayer-syncsim=piplayer.syncsim:main",
+            "piplayer-gpiotrace=piplayer.gpiotrace:main",
         ],
     },
     classifiers=[